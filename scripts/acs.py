@@ -0,0 +1,50 @@
+"""
+Chunked reads of the ACS extracts that keep only the rows of the requested block groups.
+"""
+from typing import (Dict, Iterable, List, Optional)
+
+import pandas as pd
+
+# long format cvap table, one row per geoid per lntitle
+CVAP_USECOLS = ['geoid', 'lntitle', 'cvap_est', 'cit_est']
+CVAP_DTYPES = {'geoid': str, 'lntitle': 'category', 'cvap_est': 'int32', 'cit_est': 'int32'}
+
+def geoid_suffix(acs_geoids: pd.Series) -> pd.Series:
+    """
+    Strip the summary level prefix from ACS geoids, e.g. 15000US060014206001 -> 060014206001.
+    """
+
+    return acs_geoids.str.split('US', n=1).str[-1]
+
+def read_filtered_csv(csv_path: str,
+                      geoid_col: str,
+                      geoids: Iterable[str],
+                      usecols: Optional[List[str]] = None,
+                      dtype: Optional[Dict] = None,
+                      chunksize: int = 200_000) -> pd.DataFrame:
+    """
+    Read an ACS csv in chunks and keep only rows whose geoid_col, without its prefix, is in geoids.
+
+    Only one chunk of the full file is in memory at a time.
+    """
+
+    geoids = frozenset(geoids)
+    dtype = {geoid_col: str, **(dtype or {})}
+
+    kept_chunks = [chunk.loc[geoid_suffix(chunk[geoid_col]).isin(geoids), :]
+                   for chunk in pd.read_csv(csv_path, usecols=usecols, dtype=dtype, chunksize=chunksize)]
+
+    return pd.concat(kept_chunks, ignore_index=True)
+
+def read_cvap(csv_path: str, geoids: Iterable[str], chunksize: int = 200_000) -> pd.DataFrame:
+    """
+    Read the cvap and cit estimates of the block groups from the long format ACS CVAP table.
+    """
+
+    cvap = read_filtered_csv(csv_path, 'geoid', geoids, usecols=CVAP_USECOLS, dtype=CVAP_DTYPES, chunksize=chunksize)
+    cvap['lntitle'] = cvap['lntitle'].astype(str)
+
+    # back to the int64 counts of an unfiltered read, so bg.shp keeps the same integer fields
+    cvap[['cvap_est', 'cit_est']] = cvap[['cvap_est', 'cit_est']].astype('int64')
+
+    return cvap
@@ -0,0 +1,331 @@
+"""
+Pipeline stages that build a jurisdiction's block group shapefile with ACS attributes and its heatmaps.
+"""
+from typing import (Dict, List, Optional)
+
+import math
+import os
+import pathlib
+
+import geopandas as gpd
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+import tiger
+import acs
+import pipeline
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+acs_renter_path = f'{dir_path}/../data/inputs/ACS2019_RenterBG/data_renamed.csv'
+acs_incomedist_path = f'{dir_path}/../data/inputs/ACS2019_IncomeDistBG/data_renamed.csv'
+acs_incomedist_col_path = f'{dir_path}/../data/inputs/ACS2019_IncomeDistBG/renamed_cols.csv'
+acs_demog_path = f'{dir_path}/../data/inputs/ACS_2019_CVAP/BlockGr.csv'
+california_bg_shapefile_path = f'{dir_path}/../data/inputs/tl_2019_06_bg/tl_2019_06_bg.shp'
+
+cache_dir = f'{dir_path}/../data/cache/bg_pipeline'
+
+SHAPEFILE_SUFFIXES = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
+
+# column renamings
+rename_col = {
+    'American Indian or Alaska Native Alone': 'NA',
+    'American Indian or Alaska Native and Black or African American': 'NA+AA',
+    'American Indian or Alaska Native and White': 'NA+W',
+    'Asian Alone': 'A',
+    'Asian and White': 'A+W',
+    'Black or African American Alone': 'AA',
+    'Black or African American and White': 'AA+W',
+    'Hispanic or Latino': 'L',
+    'Native Hawaiian or Other Pacific Islander Alone': 'NH',
+    'Not Hispanic or Latino': 'not_L',
+    'Remainder of Two or More Race Responses': 'rest',
+    'Total': 'total',
+    'White Alone': 'W'
+}
+
+def read_geoids(geoid_list_path: pathlib.Path) -> List[str]:
+    """
+    Read one block group GEOID per line.
+    """
+
+    with open(geoid_list_path) as bg_file:
+        return [line.strip('\n') for line in bg_file if line.strip()]
+
+###########################################################
+# data stages
+
+def filter_block_groups(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path]) -> None:
+    """
+    Read the jurisdiction's block groups from the california shapefile.
+    """
+
+    geoids = read_geoids(inputs['geoids'])
+    tiger.read_block_groups(inputs['shapefile'], geoids=geoids).to_pickle(workdir / 'bg.pkl')
+
+def write_col_dicts(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path]) -> None:
+    """
+    Write the CVAP and CIT column rename data dictionaries.
+    """
+
+    for unit in ['cvap', 'cit']:
+        unit_rename_col = {k: f'{unit}_' + v for k, v in rename_col.items()}
+        pd.DataFrame.from_dict({
+            'original': list(unit_rename_col.keys()),
+            'renamed': list(unit_rename_col.values())
+            }).to_csv(workdir / f'{unit}_col_dict.csv', index=False)
+
+def pivot_demog(acs_demog: pd.DataFrame, unit: str) -> pd.DataFrame:
+    """
+    Pivot the long format ACS table to one column per race/ethnicity category for unit 'cvap' or 'cit'.
+    """
+
+    unit_acs = acs_demog.loc[:, ['geoid', 'lntitle', f'{unit}_est']]
+    unit_acs = unit_acs.pivot(index='geoid', columns='lntitle', values=f'{unit}_est')
+
+    unit_acs.columns = unit_acs.columns.tolist()
+    unit_acs = unit_acs.reset_index()
+
+    unit_acs['GEOID'] = [i.split('15000US')[1] for i in unit_acs['geoid'].tolist()]
+
+    unit_acs = unit_acs.rename(columns={k: f'{unit}_' + v for k, v in rename_col.items()})
+    unit_acs = unit_acs.drop(columns=['geoid'])
+
+    return unit_acs
+
+def filter_acs_demog(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path]) -> None:
+    """
+    Keep the jurisdiction's rows of the statewide ACS CVAP table, read once for both the cvap and cit pivots.
+    """
+
+    geoids = read_geoids(inputs['geoids'])
+    acs.read_cvap(inputs['acs_demog'], geoids).to_pickle(workdir / 'acs_demog.pkl')
+
+def pivot_acs_demog(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path], unit: str) -> None:
+    """
+    Pivot the jurisdiction's rows of the ACS CVAP table for unit 'cvap' or 'cit'.
+    """
+
+    acs_demog = pd.read_pickle(inputs['acs_demog'] / 'acs_demog.pkl')
+
+    pivot_demog(acs_demog, unit).to_pickle(workdir / f'{unit}.pkl')
+
+def filter_acs_extract(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path]) -> None:
+    """
+    Keep the jurisdiction's rows of a renamed ACS extract, keyed by a GEOID with summary level prefix.
+    """
+
+    geoids = read_geoids(inputs['geoids'])
+    acs_extract = acs.read_filtered_csv(inputs['acs_extract'], 'GEOID', geoids)
+
+    acs_extract['GEOID'] = [i.split('US')[1] for i in acs_extract['GEOID'].tolist()]
+
+    acs_extract.to_pickle(workdir / 'extract.pkl')
+
+def merge_acs(bg: gpd.GeoDataFrame,
+              cvap: pd.DataFrame,
+              cit: pd.DataFrame,
+              renter: pd.DataFrame,
+              income: pd.DataFrame) -> gpd.GeoDataFrame:
+    """
+    Join the pivoted cvap and cit tables and the renter and income extracts onto the block groups by GEOID.
+    """
+
+    merged_acs = cvap.merge(cit, on='GEOID')
+    bg_merged = bg.merge(merged_acs, on='GEOID')
+
+    bg_merged = bg_merged.merge(renter, on='GEOID')
+    bg_merged = bg_merged.merge(income, on='GEOID')
+
+    return bg_merged
+
+def merge_block_groups(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path]) -> None:
+    """
+    Join the ACS attributes onto the block groups and write the block group shapefile.
+    """
+
+    bg_merged = merge_acs(pd.read_pickle(inputs['block_groups'] / 'bg.pkl'),
+                          pd.read_pickle(inputs['cvap'] / 'cvap.pkl'),
+                          pd.read_pickle(inputs['cit'] / 'cit.pkl'),
+                          pd.read_pickle(inputs['renter'] / 'extract.pkl'),
+                          pd.read_pickle(inputs['income'] / 'extract.pkl'))
+
+    bg_merged.to_pickle(workdir / 'bg_merged.pkl')
+    bg_merged.to_crs("EPSG:4326").to_file(workdir / 'bg.shp')
+
+###########################################################
+# plot stages
+
+def plot_demography(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path], plot_categories: List[str], file_name: str) -> None:
+    """
+    Heatmaps of CVAP and CIT counts for the race/ethnicity categories.
+    """
+
+    bg_merged = pd.read_pickle(inputs['merged'] / 'bg_merged.pkl')
+
+    plot_categories_dict = {v: k for k, v in rename_col.items()
+                            if v in plot_categories}
+
+    unit_types = ['cvap', 'cit']
+
+    fig, axs = plt.subplots(len(plot_categories), 2)
+    fig.set_size_inches((12, 11))
+
+    for unit_idx, unit in enumerate(unit_types):
+        for demog_idx, demog in enumerate(plot_categories):
+
+            ax = axs[demog_idx, unit_idx]
+
+            long_title = plot_categories_dict[demog]
+            ax.set_title(f'{unit.upper()} -- {long_title}')
+
+            divider = make_axes_locatable(ax)
+            cax = divider.append_axes("right", size="5%", pad=0.1)
+
+            ax.axes.xaxis.set_visible(False)
+            ax.axes.yaxis.set_visible(False)
+
+            bg_merged.plot(column=f'{unit}_{demog}', ax=ax, cax=cax, legend=True, cmap='Reds')
+
+    fig.savefig(workdir / file_name, dpi=200, format='png', transparent=False)
+    plt.close(fig)
+
+def plot_renters(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path]) -> None:
+    """
+    Heatmaps of housing unit counts.
+    """
+
+    bg_merged = pd.read_pickle(inputs['merged'] / 'bg_merged.pkl')
+
+    plot_categories = ['house_tot', 'house_own', 'house_rent']
+
+    fig, axs = plt.subplots(len(plot_categories), 1)
+    fig.set_size_inches((12, 11))
+
+    for house_type_idx, house_type in enumerate(plot_categories):
+
+        ax = axs[house_type_idx]
+
+        ax.set_title(house_type)
+
+        divider = make_axes_locatable(ax)
+        cax = divider.append_axes("right", size="5%", pad=0.1)
+
+        ax.axes.xaxis.set_visible(False)
+        ax.axes.yaxis.set_visible(False)
+
+        bg_merged.plot(column=house_type, ax=ax, cax=cax, legend=True, cmap='Reds')
+
+    fig.savefig(workdir / '2019_bg_renters.png', dpi=200, format='png', transparent=False)
+    plt.close(fig)
+
+def plot_income(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path]) -> None:
+    """
+    Heatmaps of household counts per income bucket.
+    """
+
+    bg_merged = pd.read_pickle(inputs['merged'] / 'bg_merged.pkl')
+
+    acs_income_col = pd.read_csv(inputs['income_cols'])
+    acs_income_col_dict = {row['renamed']: row['original'] for idx, row in acs_income_col.iterrows()}
+
+    plot_categories = [i for i in bg_merged.columns if 'income' in i]
+
+    rows = math.ceil(len(plot_categories)/2)
+    fig, axs = plt.subplots(rows, 2)
+    fig.set_size_inches((12, 11))
+
+    for income_group_idx, income_group in enumerate(plot_categories):
+
+        ax = axs[income_group_idx % rows, int(income_group_idx/rows)]
+
+        plot_title = income_group
+        if income_group in acs_income_col_dict:
+            plot_title = acs_income_col_dict[income_group]
+        ax.set_title(plot_title)
+
+        divider = make_axes_locatable(ax)
+        cax = divider.append_axes("right", size="5%", pad=0.1)
+
+        ax.axes.xaxis.set_visible(False)
+        ax.axes.yaxis.set_visible(False)
+
+        bg_merged.plot(column=income_group, ax=ax, cax=cax, legend=True, cmap='Reds')
+
+    fig.savefig(workdir / '2019_bg_income.png', dpi=200, format='png', transparent=False)
+    plt.close(fig)
+
+def plot_block_groups(workdir: pathlib.Path, inputs: Dict[str, pathlib.Path], jurisdiction_name: str) -> None:
+    """
+    Plot the block group boundaries labelled with their GEOIDs.
+    """
+
+    bg_merged = pd.read_pickle(inputs['merged'] / 'bg_merged.pkl')
+    bg_merged_crs = bg_merged.to_crs(epsg=3395)
+
+    fig, ax = plt.subplots(1, 1)
+    fig.set_size_inches((20, 20))
+
+    ax.axes.xaxis.set_visible(False)
+    ax.axes.yaxis.set_visible(False)
+
+    ax.set_title(f'{jurisdiction_name} 2019 Census Block Groups')
+
+    bg_merged_crs.boundary.plot(ax=ax)
+
+    for x, y, label in zip(bg_merged_crs.geometry.centroid.x,
+                           bg_merged_crs.geometry.centroid.y, bg_merged_crs.GEOID):
+        ax.annotate(label, xy=(x-150, y))
+
+    fig.savefig(workdir / '2019_bg.png', dpi=200, format='png', transparent=False)
+    plt.close(fig)
+
+###########################################################
+
+def make_stages(geoid_list_path: str, jurisdiction_name: str) -> List[pipeline.Stage]:
+    """
+    Return the stages building the block group shapefile and heatmaps for the GEOIDs in geoid_list_path.
+    """
+
+    return [
+        pipeline.Stage('block_groups', filter_block_groups, {'geoids': geoid_list_path, 'shapefile': california_bg_shapefile_path}),
+        pipeline.Stage('col_dicts', write_col_dicts),
+        pipeline.Stage('acs_demog', filter_acs_demog, {'geoids': geoid_list_path, 'acs_demog': acs_demog_path}),
+        pipeline.Stage('cvap', pivot_acs_demog, {'acs_demog': 'acs_demog'}, {'unit': 'cvap'}),
+        pipeline.Stage('cit', pivot_acs_demog, {'acs_demog': 'acs_demog'}, {'unit': 'cit'}),
+        pipeline.Stage('renter', filter_acs_extract, {'geoids': geoid_list_path, 'acs_extract': acs_renter_path}),
+        pipeline.Stage('income', filter_acs_extract, {'geoids': geoid_list_path, 'acs_extract': acs_incomedist_path}),
+        pipeline.Stage('merged', merge_block_groups,
+                       {'block_groups': 'block_groups', 'cvap': 'cvap', 'cit': 'cit', 'renter': 'renter', 'income': 'income'}),
+        pipeline.Stage('plot_demography_alone', plot_demography, {'merged': 'merged'},
+                       {'plot_categories': ['total', 'A', 'W', 'L', 'AA', 'NA', 'NH'],
+                        'file_name': '2019_bg_demography_alone_categories.png'}),
+        pipeline.Stage('plot_demography_combined', plot_demography, {'merged': 'merged'},
+                       {'plot_categories': ['NA+AA', 'NA+W',  'A+W', 'AA+W', 'rest'],
+                        'file_name': '2019_bg_demography_combined_categories.png'}),
+        pipeline.Stage('plot_renters', plot_renters, {'merged': 'merged'}),
+        pipeline.Stage('plot_income', plot_income, {'merged': 'merged', 'income_cols': acs_incomedist_col_path}),
+        pipeline.Stage('plot_block_groups', plot_block_groups, {'merged': 'merged'}, {'jurisdiction_name': jurisdiction_name}),
+    ]
+
+def make_jurisdiction_bg(geoid_list_path: str, output_dir: str, jurisdiction_name: str, n_workers: Optional[int] = None) -> None:
+    """
+    Run the block group pipeline for a jurisdiction and copy its outputs into output_dir.
+
+    output_dir/2019_bg gets the block group shapefile and column dictionaries, output_dir gets the heatmaps.
+    """
+
+    workdirs = pipeline.Pipeline(make_stages(geoid_list_path, jurisdiction_name), cache_dir).run(n_workers=n_workers)
+
+    output_dir = pathlib.Path(output_dir)
+
+    pipeline.publish(workdirs['merged'], output_dir / '2019_bg', names=[f'bg{suffix}' for suffix in SHAPEFILE_SUFFIXES])
+    pipeline.publish(workdirs['col_dicts'], output_dir / '2019_bg')
+
+    for name in workdirs:
+        if name.startswith('plot_'):
+            pipeline.publish(workdirs[name], output_dir)
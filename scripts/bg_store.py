@@ -0,0 +1,145 @@
+"""
+County partitioned GeoParquet store of statewide block groups joined with their ACS attributes.
+
+Each county is one file, store_dir/COUNTYFP=<fips>/bg.parquet, with rows sorted by GEOID and per row bounding
+box columns. store_dir/counties.parquet holds the bounds of each county. Extracting a jurisdiction only opens
+the files of its counties and pushes the GEOID or bounding box filter down to the parquet reader.
+"""
+from typing import (Iterable, List, Optional, Tuple)
+
+import os
+import pathlib
+
+import geopandas as gpd
+import pandas as pd
+
+import tiger
+import acs
+import bg_pipeline
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+store_dir = f'{dir_path}/../data/store/2019_bg'
+
+BBOX_COLUMNS = ['bbox_minx', 'bbox_miny', 'bbox_maxx', 'bbox_maxy']
+COUNTY_INDEX_NAME = 'counties.parquet'
+
+def county_path(store_dir: str, countyfp: str) -> pathlib.Path:
+    """
+    Return the partition file of a county.
+    """
+
+    return pathlib.Path(store_dir) / f'COUNTYFP={countyfp}' / 'bg.parquet'
+
+def build_store(store_dir: str = store_dir,
+                shapefile_path: str = bg_pipeline.california_bg_shapefile_path,
+                acs_demog_path: str = bg_pipeline.acs_demog_path,
+                acs_renter_path: str = bg_pipeline.acs_renter_path,
+                acs_incomedist_path: str = bg_pipeline.acs_incomedist_path) -> None:
+    """
+    Join the statewide block groups with the cvap, cit, renter and income attributes and write one
+    GeoParquet file per county plus the county bounds index.
+    """
+
+    bg = tiger.read_block_groups(shapefile_path)
+    geoids = bg['GEOID'].tolist()
+
+    acs_demog = acs.read_cvap(acs_demog_path, geoids)
+
+    extracts = []
+    for extract_path in [acs_renter_path, acs_incomedist_path]:
+        extract = acs.read_filtered_csv(extract_path, 'GEOID', geoids)
+        extract['GEOID'] = [i.split('US')[1] for i in extract['GEOID'].tolist()]
+        extracts.append(extract)
+
+    bg_merged = bg_pipeline.merge_acs(bg,
+                                      bg_pipeline.pivot_demog(acs_demog, 'cvap'),
+                                      bg_pipeline.pivot_demog(acs_demog, 'cit'),
+                                      *extracts)
+
+    bg_merged[BBOX_COLUMNS] = bg_merged.geometry.bounds.to_numpy()
+    bg_merged = bg_merged.sort_values('GEOID').reset_index(drop=True)
+
+    county_bounds = []
+    for countyfp, county_bg in bg_merged.groupby('COUNTYFP'):
+        path = county_path(store_dir, countyfp)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        county_bg.reset_index(drop=True).to_parquet(path, index=False)
+
+        minx, miny, maxx, maxy = county_bg.total_bounds
+        county_bounds.append({'COUNTYFP': countyfp, 'n_block_groups': len(county_bg),
+                              'bbox_minx': minx, 'bbox_miny': miny, 'bbox_maxx': maxx, 'bbox_maxy': maxy})
+
+    pd.DataFrame(county_bounds).to_parquet(pathlib.Path(store_dir) / COUNTY_INDEX_NAME, index=False)
+
+def empty_frame(store_dir: str) -> gpd.GeoDataFrame:
+    """
+    Return a frame with no rows and the columns, dtypes and CRS of the store.
+    """
+
+    counties = pd.read_parquet(pathlib.Path(store_dir) / COUNTY_INDEX_NAME)
+
+    # no GEOID is empty, the row group statistics skip every row
+    return gpd.read_parquet(county_path(store_dir, counties['COUNTYFP'].iloc[0]), filters=[('GEOID', '==', '')])
+
+def read_counties(store_dir: str, countyfps: Iterable[str], filters: Optional[List] = None) -> gpd.GeoDataFrame:
+    """
+    Read the given counties' partitions with the parquet row filters pushed down.
+
+    Raises ValueError if a county is not in the store.
+    """
+
+    countyfps = sorted(set(countyfps))
+
+    missing = [countyfp for countyfp in countyfps if not county_path(store_dir, countyfp).exists()]
+    if missing:
+        raise ValueError(f'counties not in the store {store_dir}: {", ".join(missing)}')
+
+    parts = [gpd.read_parquet(county_path(store_dir, countyfp), filters=filters) for countyfp in countyfps]
+
+    return pd.concat(parts, ignore_index=True) if parts else empty_frame(store_dir)
+
+def read_jurisdiction(geoids: Iterable[str], store_dir: str = store_dir) -> gpd.GeoDataFrame:
+    """
+    Read the block groups with the given GEOIDs, opening only their counties' partitions.
+
+    Raises ValueError listing the GEOIDs that are not in the store.
+    """
+
+    geoids = sorted(set(geoids))
+
+    # GEOID is state (2) + county (3) + tract (6) + block group (1)
+    countyfps = sorted({geoid[2:5] for geoid in geoids})
+    stored_countyfps = [countyfp for countyfp in countyfps if county_path(store_dir, countyfp).exists()]
+
+    bg = read_counties(store_dir, stored_countyfps, filters=[('GEOID', 'in', geoids)])
+
+    missing = sorted(set(geoids) - set(bg['GEOID']))
+    if missing:
+        raise ValueError(f'GEOIDs not in the store {store_dir}: {", ".join(missing)}')
+
+    return bg
+
+def read_bbox(bbox: Tuple[float, float, float, float], store_dir: str = store_dir) -> gpd.GeoDataFrame:
+    """
+    Read the block groups whose bounding box intersects bbox, in the store CRS.
+    """
+
+    minx, miny, maxx, maxy = bbox
+
+    counties = pd.read_parquet(pathlib.Path(store_dir) / COUNTY_INDEX_NAME)
+    counties = counties.loc[(counties['bbox_maxx'] >= minx) & (counties['bbox_minx'] <= maxx) &
+                            (counties['bbox_maxy'] >= miny) & (counties['bbox_miny'] <= maxy), :]
+
+    filters = [('bbox_maxx', '>=', minx), ('bbox_minx', '<=', maxx),
+               ('bbox_maxy', '>=', miny), ('bbox_miny', '<=', maxy)]
+
+    return read_counties(store_dir, counties['COUNTYFP'], filters=filters)
+
+def write_jurisdiction_shapefile(geoids: Iterable[str], shapefile_path: str, store_dir: str = store_dir) -> None:
+    """
+    Write a jurisdiction's block group shapefile, with the same columns make_albany_bg.py writes.
+    """
+
+    bg = read_jurisdiction(geoids, store_dir).drop(columns=BBOX_COLUMNS)
+    bg.to_crs("EPSG:4326").to_file(shapefile_path)
@@ -0,0 +1,88 @@
+"""
+Local basemap raster, seeded once from a tile source and drawn under every map without network access.
+"""
+from typing import (Optional)
+
+import os
+
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+import contextily as cx
+import geopandas as gpd
+import matplotlib.axes
+
+def seed_basemap(geodataframe: gpd.GeoDataFrame,
+                 raster_path: str,
+                 source: Optional[str] = None,
+                 zoom: str = 'auto') -> None:
+    """
+    Download the tiles covering the geodataframe once and save them as a GeoTIFF.
+
+    source - xyz tile provider or url, e.g. a local tile server, defaults to contextily's default provider
+    """
+
+    west, south, east, north = geodataframe.to_crs('EPSG:4326').total_bounds
+
+    tmp_path = f'{raster_path}.{os.getpid()}.tmp.tif'
+    cx.bounds2raster(west, south, east, north, tmp_path, zoom=zoom, source=source, ll=True)
+    os.replace(tmp_path, raster_path)
+
+class Basemap:
+    """
+    A basemap raster decoded and reprojected to the map CRS once, drawn with a single imshow per map.
+    """
+
+    def __init__(self, raster_path: str, crs: str) -> None:
+
+        with rasterio.open(raster_path) as raster:
+            img = np.moveaxis(raster.read(), 0, -1)
+            transform = raster.transform
+            raster_crs = raster.crs.to_string()
+
+        if CRS.from_user_input(crs) != CRS.from_user_input(raster_crs):
+            img, transform = cx.warp_img_transform(img, transform, raster_crs, crs)
+
+        height, width = img.shape[:2]
+
+        self.img = img
+        self.extent = (transform.c, transform.c + transform.a * width, transform.f + transform.e * height, transform.f)
+
+    def add_to(self, ax: matplotlib.axes.Axes) -> None:
+        """
+        Draw the basemap under what is already on the axes, keeping the axes limits, like cx.add_basemap.
+        """
+
+        xmin, xmax, ymin, ymax = ax.axis()
+        ax.imshow(self.img, extent=self.extent, interpolation='bilinear')
+        ax.axis((xmin, xmax, ymin, ymax))
+
+def ensure_basemap(geodataframe: gpd.GeoDataFrame, raster_path: str, source: Optional[str] = None) -> None:
+    """
+    Seed the basemap raster if it does not exist yet.
+
+    On machines without network access copy a seeded raster to raster_path beforehand.
+    """
+
+    if not os.path.exists(raster_path):
+        print(f'seeding basemap {raster_path}')
+        seed_basemap(geodataframe, raster_path, source=source)
+
+def load_basemap(geodataframe: gpd.GeoDataFrame, raster_path: str, source: Optional[str] = None) -> Basemap:
+    """
+    Return the basemap for the geodataframe's CRS, seeding the raster first if it does not exist yet.
+    """
+
+    ensure_basemap(geodataframe, raster_path, source=source)
+
+    return Basemap(raster_path, geodataframe.crs.to_string())
+
+def add_basemap(ax: matplotlib.axes.Axes, geodataframe: gpd.GeoDataFrame, basemap: Optional[Basemap] = None) -> None:
+    """
+    Draw the cached basemap if there is one, otherwise fetch tiles with contextily.
+    """
+
+    if basemap is not None:
+        basemap.add_to(ax)
+    else:
+        cx.add_basemap(ax, crs=geodataframe.crs.to_string())
@@ -0,0 +1,73 @@
+# %%
+import math
+import numbers
+import pathlib
+import time
+import os
+
+import gerrychain as gc
+import geopandas as gpd
+
+import adjacency
+
+# paths
+file_path = pathlib.Path(os.path.realpath(__file__))
+dir_path = file_path.parent
+
+shapefile_paths = {
+    'albany': dir_path / '../../data/albany/2019_bg/bg.shp',
+    'alameda': dir_path / '../../data/alameda/2019_bg/bg.shp',
+}
+
+def same_value(value, expected) -> bool:
+    """
+    Compare node or edge attributes, numbers up to floating point error.
+    """
+
+    if isinstance(value, numbers.Real) and isinstance(expected, numbers.Real) and not isinstance(expected, bool):
+        return math.isclose(value, expected, rel_tol=1e-9, abs_tol=1e-12) or (math.isnan(value) and math.isnan(expected))
+
+    return value == expected
+
+def assert_same_graph(graph: gc.Graph, expected: gc.Graph) -> None:
+    """
+    Assert that the graphs have the same edges, edge and node attributes and CRS.
+    """
+
+    edges = {frozenset(edge) for edge in graph.edges}
+    expected_edges = {frozenset(edge) for edge in expected.edges}
+    assert edges == expected_edges, f'edges only in one graph: {sorted(map(tuple, edges ^ expected_edges))}'
+
+    for edge in expected.edges:
+        assert same_value(graph.edges[edge]['shared_perim'], expected.edges[edge]['shared_perim']), f'shared_perim of {edge}'
+
+    assert set(graph.nodes) == set(expected.nodes)
+    for node in expected.nodes:
+        node_data, expected_data = graph.nodes[node], expected.nodes[node]
+        assert set(node_data) == set(expected_data), f'attributes of node {node}: {set(node_data) ^ set(expected_data)}'
+        for key, expected_value in expected_data.items():
+            assert same_value(node_data[key], expected_value), f'{key} of node {node}'
+
+    assert graph.graph['crs'] == expected.graph['crs']
+
+#######################################################
+# check against gerrychain and time both builders
+
+for name, shapefile_path in shapefile_paths.items():
+
+    gdf = gpd.read_file(filename=shapefile_path)
+
+    start = time.perf_counter()
+    gc_graph = gc.Graph.from_geodataframe(gdf)
+    gc_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    graph = adjacency.build_graph(gdf)
+    elapsed = time.perf_counter() - start
+
+    assert_same_graph(graph, gc_graph)
+
+    print(f'{name}: {len(gdf)} block groups, {graph.number_of_edges()} edges, same graph as gerrychain, '
+          f'gerrychain {gc_elapsed:.2f}s, adjacency {elapsed:.2f}s')
+
+# %%
@@ -0,0 +1,70 @@
+# %%
+import functools
+import pathlib
+import time
+import os
+
+import gerrychain as gc
+import gerrychain.accept as accept
+import gerrychain.constraints as constraints
+import gerrychain.proposals as proposals
+
+import common
+import fast_recom
+import bundle
+import telemetry
+
+# paths
+file_path = pathlib.Path(os.path.realpath(__file__))
+dir_path = file_path.parent
+
+albany_bg_shapefile_path = dir_path / '../../data/albany/2019_bg/bg.shp'
+
+small_district_lower_bound_prop = 0.35
+small_district_upper_bound_prop = 0.45
+n_iter = 2_000
+
+#######################################################
+# set up graph and initial partition shared by both proposals
+
+jurisdiction = bundle.load_bundle(albany_bg_shapefile_path)
+g = jurisdiction.graph()
+gdf = jurisdiction.geodataframe()
+
+updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+
+unequal_size_constraint = common.make_unequal_size_constraint(small_district_lower_bound_prop, small_district_upper_bound_prop)
+
+initial_partition = common.make_chain(g, updaters, unequal_size_constraint, n_iter).initial_state
+
+equal_proportions_size = sum(gdf['cvap_total'])/2
+
+#######################################################
+# time chains
+
+proposal_engines = {
+    'gerrychain': functools.partial(proposals.recom, pop_col="cvap_total", pop_target=equal_proportions_size, epsilon=50, node_repeats=10),
+    'array': fast_recom.ArrayRecom(g, pop_col='cvap_total', pop_target=equal_proportions_size, epsilon=50),
+    'unequal': fast_recom.UnequalRecom(g, 'cvap_total', small_district_lower_bound_prop, small_district_upper_bound_prop),
+}
+
+for engine_name, proposal in proposal_engines.items():
+
+    chain_telemetry = telemetry.ChainTelemetry()
+
+    chain = gc.MarkovChain(
+        proposal=chain_telemetry.timed_proposal(proposal),
+        constraints=chain_telemetry.timed_constraints([unequal_size_constraint, constraints.contiguous]),
+        accept=accept.always_accept,
+        initial_state=initial_partition,
+        total_steps=n_iter
+    )
+
+    start = time.perf_counter()
+    unique_partitions = common.filter_unique_partitions(chain_telemetry.iter_steps(chain))
+    elapsed = time.perf_counter() - start
+
+    print(f'{engine_name}: {len(unique_partitions)} unique partitions ({len(unique_partitions) / elapsed:.0f}/s), '
+          f'{chain_telemetry.describe()}')
+
+# %%
@@ -0,0 +1,304 @@
+"""
+Precompiled jurisdiction bundle holding the adjacency, attributes, GEOIDs, CRS and geometry of a block group shapefile.
+
+The bundle is a single binary file: a JSON header followed by aligned arrays, read with one memory map. It is
+keyed by a hash of the shapefile, so it is only rebuilt when the shapefile changes.
+"""
+from typing import (Dict, List, Optional, Tuple)
+
+import hashlib
+import json
+import os
+import pathlib
+import struct
+
+import numpy as np
+import pandas as pd
+
+import gerrychain as gc
+import geopandas as gpd
+
+import adjacency
+
+BUNDLE_VERSION = 2
+MAGIC = b'ALBBNDL1'
+ALIGNMENT = 64
+
+SHAPEFILE_SUFFIXES = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
+
+def default_bundle_path(shapefile_path: str) -> pathlib.Path:
+    """
+    Return the bundle path next to the shapefile.
+    """
+
+    return pathlib.Path(shapefile_path).with_suffix('.bundle')
+
+def source_hash(shapefile_path: str, simplify_tolerance: float) -> str:
+    """
+    Hash the shapefile and its sidecar files together with the bundle settings.
+    """
+
+    shapefile_path = pathlib.Path(shapefile_path)
+
+    h = hashlib.sha256()
+    h.update(f'{BUNDLE_VERSION};{simplify_tolerance!r}'.encode())
+    for suffix in SHAPEFILE_SUFFIXES:
+        path = shapefile_path.with_suffix(suffix)
+        if path.exists():
+            h.update(suffix.encode())
+            h.update(path.read_bytes())
+
+    return h.hexdigest()
+
+def write_array_file(path: str, magic: bytes, header: Dict, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Write a JSON header followed by the arrays, each aligned for memory mapping.
+
+    The array layout is added to the header under 'arrays'. The file is written to a temporary path and
+    swapped in, so concurrent readers never see a partial file.
+    """
+
+    header = dict(header, arrays={})
+
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        header['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(magic) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    path = pathlib.Path(path)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(magic)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+def read_array_file(path: str, magic: bytes) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """
+    Memory map a file written by write_array_file. Returns the header and read only views of the arrays.
+    """
+
+    with open(path, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f'{path} does not start with {magic!r}')
+        header_len, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len))
+
+    data_start = -(-(len(magic) + 8 + header_len) // ALIGNMENT) * ALIGNMENT
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+
+    arrays = {name: np.ndarray(shape=tuple(spec['shape']),
+                               dtype=np.dtype(spec['dtype']),
+                               buffer=mm,
+                               offset=data_start + spec['offset'])
+              for name, spec in header['arrays'].items()}
+
+    return header, arrays
+
+class JurisdictionBundle:
+    """
+    Arrays of a jurisdiction's block groups, in shapefile row order.
+
+    Nodes are numbered by row like gc.Graph.from_file. The neighbors of node i are
+    indices[indptr[i]:indptr[i + 1]] and shared_perim holds the matching edge perimeters.
+    """
+
+    def __init__(self, header: Dict, arrays: Dict[str, np.ndarray]) -> None:
+
+        self.header = header
+        self.source_hash = header['source_hash']
+        self.crs = header['crs']
+        self.geoids = header['geoids']
+        self.attribute_columns = header['attribute_columns']
+        self.text_columns = header['text_columns']
+
+        self.attributes = arrays['attributes']
+        self.indptr = arrays['indptr']
+        self.indices = arrays['indices']
+        self.shared_perim = arrays['shared_perim']
+        self.area = arrays['area']
+        self.centroid_x = arrays['centroid_x']
+        self.centroid_y = arrays['centroid_y']
+        self.boundary_node = arrays['boundary_node']
+        self.boundary_perim = arrays['boundary_perim']
+        self.wkb_offsets = arrays['wkb_offsets']
+        self.wkb = arrays['wkb']
+
+    def __len__(self) -> int:
+        return len(self.geoids)
+
+    def node_records(self) -> List[Dict]:
+        """
+        Return the shapefile columns of each node as dicts, with the original column dtypes.
+        """
+
+        columns = dict(self.text_columns)
+        for col_idx, (col, dtype) in enumerate(self.attribute_columns):
+            columns[col] = self.attributes[:, col_idx].astype(dtype).tolist()
+
+        return pd.DataFrame(columns, columns=self.header['column_order']).to_dict('records')
+
+    def graph(self) -> gc.Graph:
+        """
+        Rebuild the gerrychain graph with the same node and edge data as gc.Graph.from_file, except that
+        the 'geometry' of each node is the simplified geometry.
+        """
+
+        graph = gc.Graph()
+        geometry = self.geometry()
+
+        area = self.area.tolist()
+        boundary_node = self.boundary_node.tolist()
+        boundary_perim = self.boundary_perim.tolist()
+
+        for node, record in enumerate(self.node_records()):
+            record['geometry'] = geometry.iloc[node]
+            record['area'] = area[node]
+            record['boundary_node'] = boundary_node[node]
+            if boundary_node[node]:
+                record['boundary_perim'] = boundary_perim[node]
+            graph.add_node(node, **record)
+
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        shared_perim = self.shared_perim.tolist()
+
+        graph.add_edges_from((u, indices[edge_idx], {'shared_perim': shared_perim[edge_idx]})
+                             for u in range(len(self))
+                             for edge_idx in range(indptr[u], indptr[u + 1])
+                             if u < indices[edge_idx])
+
+        graph.geometry = geometry
+        if geometry.crs is not None:
+            graph.graph['crs'] = geometry.crs.to_json()
+
+        return graph
+
+    def geometry(self) -> gpd.GeoSeries:
+        """
+        Return the simplified block group geometry.
+        """
+
+        offsets = self.wkb_offsets.tolist()
+        wkb = self.wkb.tobytes()
+
+        return gpd.GeoSeries.from_wkb([wkb[start:end] for start, end in zip(offsets[:-1], offsets[1:])], crs=self.crs)
+
+    def geodataframe(self) -> gpd.GeoDataFrame:
+        """
+        Return the block groups as a geodataframe with the shapefile columns and simplified geometry.
+        """
+
+        gdf = gpd.GeoDataFrame(self.node_records(), geometry=self.geometry(), crs=self.crs)
+
+        # exact geometry stats, so stats.area_moments does not use the simplified geometry
+        gdf['bg_area'] = self.area
+        gdf['bg_centroid_x'] = self.centroid_x
+        gdf['bg_centroid_y'] = self.centroid_y
+
+        return gdf
+
+def build_bundle(shapefile_path: str, bundle_path: str, simplify_tolerance: float = 0.0) -> None:
+    """
+    Read the shapefile once, build its adjacency graph and write the bundle.
+
+    simplify_tolerance - tolerance passed to GeoSeries.simplify for the stored geometry, in CRS units.
+                         Areas, centroids and perimeters are always taken from the exact geometry.
+    """
+
+    gdf = gpd.read_file(filename=shapefile_path)
+    graph = adjacency.build_graph(gdf)
+
+    n_nodes = len(gdf)
+    data_columns = [col for col in gdf.columns if col != gdf.geometry.name]
+
+    attribute_cols = [col for col in data_columns if pd.api.types.is_numeric_dtype(gdf[col])]
+    text_cols = [col for col in data_columns if col not in attribute_cols]
+
+    # adjacency in csr form with the shared perimeter of every edge
+    neighbors = [sorted(graph.neighbors(node)) for node in range(n_nodes)]
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(node_neighbors) for node_neighbors in neighbors])
+    indices = np.array([u for node_neighbors in neighbors for u in node_neighbors], dtype=np.int64)
+    shared_perim = np.array([graph.edges[node, u].get('shared_perim', 0.0)
+                             for node, node_neighbors in enumerate(neighbors) for u in node_neighbors], dtype=float)
+
+    # exact geometry stats
+    centroid = gdf.geometry.centroid
+
+    # simplified geometry as concatenated wkb
+    geometry = gdf.geometry.simplify(simplify_tolerance, preserve_topology=True) if simplify_tolerance else gdf.geometry
+    wkbs = [geom.wkb for geom in geometry]
+    wkb_offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+    wkb_offsets[1:] = np.cumsum([len(wkb) for wkb in wkbs])
+
+    arrays = {
+        'attributes': gdf[attribute_cols].to_numpy(dtype=float).reshape(n_nodes, len(attribute_cols)),
+        'indptr': indptr,
+        'indices': indices,
+        'shared_perim': shared_perim,
+        'area': gdf.geometry.area.to_numpy(dtype=float),
+        'centroid_x': centroid.x.to_numpy(dtype=float),
+        'centroid_y': centroid.y.to_numpy(dtype=float),
+        'boundary_node': np.array([bool(graph.nodes[node].get('boundary_node', False)) for node in range(n_nodes)]),
+        'boundary_perim': np.array([graph.nodes[node].get('boundary_perim', 0.0) for node in range(n_nodes)], dtype=float),
+        'wkb_offsets': wkb_offsets,
+        'wkb': np.frombuffer(b''.join(wkbs), dtype=np.uint8),
+    }
+
+    header = {
+        'version': BUNDLE_VERSION,
+        'source_hash': source_hash(shapefile_path, simplify_tolerance),
+        'crs': gdf.crs.to_wkt() if gdf.crs else None,
+        'geoids': gdf['GEOID'].tolist(),
+        'column_order': data_columns,
+        'attribute_columns': [(col, str(gdf[col].dtype)) for col in attribute_cols],
+        'text_columns': {col: gdf[col].tolist() for col in text_cols},
+    }
+
+    write_array_file(bundle_path, MAGIC, header, arrays)
+
+def read_bundle(bundle_path: str) -> JurisdictionBundle:
+    """
+    Memory map a bundle file. The arrays are read only views into the map.
+    """
+
+    try:
+        header, arrays = read_array_file(bundle_path, MAGIC)
+    except ValueError:
+        raise ValueError(f'{bundle_path} is not a jurisdiction bundle')
+
+    return JurisdictionBundle(header, arrays)
+
+def load_bundle(shapefile_path: str,
+                bundle_path: Optional[str] = None,
+                simplify_tolerance: float = 0.0) -> JurisdictionBundle:
+    """
+    Return the bundle for the shapefile, building it first if it is missing or the shapefile has changed.
+    """
+
+    bundle_path = bundle_path or default_bundle_path(shapefile_path)
+    expected_hash = source_hash(shapefile_path, simplify_tolerance)
+
+    if os.path.exists(bundle_path):
+        try:
+            jurisdiction = read_bundle(bundle_path)
+        except ValueError:
+            jurisdiction = None
+
+        if jurisdiction is not None and jurisdiction.source_hash == expected_hash:
+            return jurisdiction
+
+    print(f'building jurisdiction bundle {bundle_path}')
+    build_bundle(shapefile_path, bundle_path, simplify_tolerance=simplify_tolerance)
+
+    return read_bundle(bundle_path)
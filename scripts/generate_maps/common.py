@@ -1,42 +1,45 @@
 """
 Contains function used to generate a series of gerrychain maps and work with the output.
 """
-from typing import (List, Optional, Dict)
+from typing import (Dict, List, Optional)
 
 import functools
 import pathlib
+import math
 import os
 
+import numpy as np
 import pandas as pd
 
 import gerrychain as gc
 import geopandas as gpd
-import gerrychain.tree as gc_tree
 import gerrychain.accept as accept
 import gerrychain.constraints as constraints
 import gerrychain.proposals as proposals
 
 import plot
+import enumeration
+import zdd
+import fast_recom
+import ensemble
+import dedup
+import stats
+import bundle
+import basemap as bm
+import render_pool
+import web_output
+import lazy_render
+import representatives
+import plan_store
+import seeding
+import telemetry
 
 def filter_unique_partitions(chain: List) -> List:
     """
     Return only unique partitions from the chain.
     """
 
-    partition_dict = {}
-    for partition in chain:
-
-        district_pop = partition['cvap_total']
-        district1_is_small = district_pop[1] < district_pop[2]
-
-        small_district_id = 1 if district1_is_small else 2
-        small_district_node_ids = [k for k, v in dict(partition.assignment).items() if v == small_district_id]
-        sorted_small_district_node_ids = tuple(sorted(small_district_node_ids))
-
-        if sorted_small_district_node_ids not in partition_dict:
-            partition_dict.update({sorted_small_district_node_ids: partition})
-
-    return list(partition_dict.values())
+    return list(dedup.iter_unique_partitions(chain))
 
 def unequal_size_constraint_template(partition: gc.Partition, lower_bound_prop: float, upper_bound_prop: float) -> bool:
     """
@@ -60,6 +63,18 @@ def unequal_size_constraint_template(partition: gc.Partition, lower_bound_prop:
     else:
         return False
 
+def make_unequal_size_constraint(lower_bound_prop: float, upper_bound_prop: float) -> functools.partial:
+    """
+    Make unequal_size_constraint_template into a named chain constraint for the given bounds.
+    """
+
+    unequal_size_constraint = functools.partial(unequal_size_constraint_template,
+                                                lower_bound_prop=lower_bound_prop, 
+                                                upper_bound_prop=upper_bound_prop)
+    unequal_size_constraint.__name__ = 'unequal_size_constraint'
+
+    return unequal_size_constraint
+
 def reorganize_partition_info(partition: gc.Partition, n_district_electeds: Optional[List[int]] = None) -> Dict:
     """
     Extract and reorder information from parition so that large district has ID 1 and small district has ID 2.
@@ -95,6 +110,9 @@ def reorganize_partition_info(partition: gc.Partition, n_district_electeds: Opti
 def calc_partition_stats(partition_idx: int, partition_info: Dict, geodataframe: gpd.GeoDataFrame) -> pd.DataFrame:
     """
     Calculate various statistics from the partition and geodataframe.
+
+    run_recom uses stats.calc_ensemble_stats instead. This one plan at a time version is kept as the
+    reference that test_stats.py checks calc_ensemble_stats against.
     """
 
     updaters = partition_info['updaters']
@@ -207,27 +225,7 @@ def calc_partition_stats(partition_idx: int, partition_info: Dict, geodataframe:
     df['SD_income_range_at_quota'] = SD_bucket_reached
 
     # add quadrant
-    assigned_gdf = geodataframe.copy()
-    assigned_gdf['assignment'] = [partition_info['assignment'][geoid] for geoid in assigned_gdf['GEOID']]
-    
-    # get small district centroid
-    district_gdf = assigned_gdf.dissolve(by='assignment').reset_index()
-    SD_x = district_gdf.loc[district_gdf['assignment'] == 2, 'geometry'].centroid.x.item()
-    SD_y = district_gdf.loc[district_gdf['assignment'] == 2, 'geometry'].centroid.y.item()
-
-    # get centroid for all of albany
-    whole_albany_gdf = assigned_gdf.dissolve()
-    whole_albany_x = whole_albany_gdf.geometry.centroid.x.item()
-    whole_albany_y = whole_albany_gdf.geometry.centroid.y.item()
-
-    if SD_x < whole_albany_x and SD_y > whole_albany_y:
-        df['SD_quadrant'] = 'NW'
-    elif SD_x < whole_albany_x and SD_y < whole_albany_y:
-        df['SD_quadrant'] = 'SW'
-    elif SD_x > whole_albany_x and SD_y > whole_albany_y:
-        df['SD_quadrant'] = 'NE'
-    elif SD_x > whole_albany_x and SD_y < whole_albany_y:
-        df['SD_quadrant'] = 'SE'
+    df['SD_quadrant'] = stats.calc_sd_quadrant(partition_info['assignment'], geodataframe)
 
     # add geoid
     df['LD_geoids'] = ";".join(sorted(k for k, v in partition_info['assignment'].items() if v == 1))
@@ -235,103 +233,243 @@ def calc_partition_stats(partition_idx: int, partition_info: Dict, geodataframe:
 
     return df.to_frame().transpose()
     
+def make_chain(graph: gc.Graph, 
+               updaters: Dict, 
+               unequal_size_constraint: functools.partial, 
+               n_iter: int, 
+               proposal_engine: str = 'gerrychain',
+               chain_telemetry: Optional[telemetry.ChainTelemetry] = None) -> gc.MarkovChain:
+    """
+    Make an initial partition that satisfies the unequal size constraint and a ReCom chain starting from it.
+
+    unequal_size_constraint - made by make_unequal_size_constraint, the seed plan is drawn inside its bounds
+    proposal_engine - 'gerrychain' for proposals.recom, 'array' for fast_recom.ArrayRecom or 'unequal' for
+                      fast_recom.UnequalRecom, which only proposes plans inside the constraint's bounds
+    chain_telemetry - times the proposal and constraints of the chain, iterate it with chain_telemetry.iter_steps
+    """
+
+    # make initial assignment, cut directly inside the bounds of make_unequal_size_constraint
+    total_pop = sum(graph.nodes[n]['cvap_total'] for n in graph.nodes)
+    equal_proportions_size = total_pop/2
+
+    initial_assignment, seed_report = seeding.seed_unequal_partition(graph, 'cvap_total', 
+                                                                     unequal_size_constraint.keywords['lower_bound_prop'], 
+                                                                     unequal_size_constraint.keywords['upper_bound_prop'])
+
+    initial_partition = gc.GeographicPartition(graph, assignment=initial_assignment, updaters=updaters)
+
+    percs = {k: 100*v/total_pop for k, v in initial_partition['cvap_total'].items()}
+    print(f"initial partition {percs} after {seed_report['attempts']} attempts ({seed_report['elapsed']:.2f}s)")
+
+    # make chain
+    if proposal_engine == 'array':
+        proposal = fast_recom.ArrayRecom(graph, pop_col='cvap_total', pop_target=equal_proportions_size, epsilon=50)
+    elif proposal_engine == 'unequal':
+        proposal = fast_recom.UnequalRecom(graph, 'cvap_total', 
+                                           unequal_size_constraint.keywords['lower_bound_prop'], 
+                                           unequal_size_constraint.keywords['upper_bound_prop'])
+    else:
+        proposal = functools.partial(proposals.recom, pop_col="cvap_total", pop_target=equal_proportions_size, epsilon=50, node_repeats=10)
+
+    chain_constraints = [unequal_size_constraint, constraints.contiguous]
+
+    if chain_telemetry is not None:
+        proposal = chain_telemetry.timed_proposal(proposal)
+        chain_constraints = chain_telemetry.timed_constraints(chain_constraints)
+
+    chain = gc.MarkovChain(
+        proposal=proposal,
+        constraints=chain_constraints,
+        accept=accept.always_accept,
+        initial_state=initial_partition,
+        total_steps=n_iter
+    )
+
+    return chain
+
 def run_recom(small_district_lower_bound_prop: float, 
               small_district_upper_bound_prop: float, 
               n_district_electeds: List[int], 
               n_iter: int, 
-              output_dir: str) -> None:
+              output_dir: str,
+              method: str = 'recom',
+              proposal_engine: str = 'gerrychain',
+              n_chains: Optional[int] = None,
+              base_seed: int = 0,
+              render_mode: str = 'template',
+              n_render_workers: Optional[int] = None,
+              render_pngs: bool = False,
+              n_representatives: Optional[int] = None,
+              representative_weight_col: Optional[str] = None,
+              telemetry_sample_every: int = 1,
+              slow_step_seconds: Optional[float] = None) -> None:
     """
     Read in shapefiles, create updaters, run chain, calculate statistics, and plot.
+
+    method - 'recom' to sample plans with a ReCom chain of n_iter steps, 'enumerate' to list every
+             valid plan (n_iter is ignored), 'zdd' to draw n_iter plans uniformly from a decision
+             diagram of every valid plan, or 'ensemble' to split n_iter steps across n_chains ReCom
+             chains run in parallel
+    proposal_engine - 'gerrychain', 'array' or 'unequal', the ReCom proposal used by the 'recom' and 'ensemble'
+                      methods, see make_chain
+    n_chains - number of chains for the 'ensemble' method, defaults to the number of cores
+    base_seed - seed the 'ensemble' chain seeds are derived from, recorded in chain_seeds.csv
+    render_mode - 'template' to draw the map figures once and update them per partition, or 'full' to
+                  build each figure from scratch with plot.plot_partition and plot.plot_partition_stats
+    n_render_workers - number of processes rendering maps, defaults to the number of cores
+    render_pngs - also render the two PNGs of every map, otherwise only the compact explorer.html,
+                  geometry.geojson and assignments.bin are written next to map_stats.csv
+    n_representatives - cluster the unique plans into this many clusters, write their medoid plans and
+                        sizes to representatives.csv and only render and summarize the medoids, weighted
+                        by cluster size
+    representative_weight_col - block group column, e.g. 'cvap_total', weighting the distance between
+                                plans by the block groups they disagree on, plain Hamming distance if None
+    telemetry_sample_every - write every nth step of the 'recom' chain to chain_telemetry.jsonl, the totals
+                             in chain_telemetry.json always cover every step
+    slow_step_seconds - also write any step slower than this
     """
 
+    if method not in ('recom', 'enumerate', 'zdd', 'ensemble'):
+        raise ValueError(f'unknown method {method}')
+
+    if render_mode not in ('template', 'full'):
+        raise ValueError(f'unknown render_mode {render_mode}')
+
     # paths
     file_path = pathlib.Path(os.path.realpath(__file__))
     dir_path = file_path.parent
 
     albany_bg_shapefile_path = dir_path / '../../data/albany/2019_bg/bg.shp'
     acs_incomedist_col_path = dir_path / '../../data/inputs/ACS2019_IncomeDistBG/renamed_cols.csv'
+    basemap_path = dir_path / '../../data/albany/basemap.tif'
 
     output_dir.mkdir(exist_ok=True)
 
     map_output_dir = output_dir / 'maps'
-    map_output_dir.mkdir(exist_ok=True)
+    if render_pngs:
+        map_output_dir.mkdir(exist_ok=True)
 
     map_stats_path = output_dir / 'map_stats.csv'
+    chain_seeds_path = output_dir / 'chain_seeds.csv'
     map_summary_plot_path = output_dir / 'map_summary.png'
-
-    # read in albany block groups
-    g = gc.Graph.from_file(filename=albany_bg_shapefile_path)
-    gdf = gpd.read_file(filename=albany_bg_shapefile_path)
+    representatives_path = output_dir / 'representatives.csv'
+    telemetry_path = output_dir / 'chain_telemetry.jsonl'
+    telemetry_summary_path = output_dir / 'chain_telemetry.json'
+    plan_store_path = output_dir / plan_store.STORE_NAME
+
+    # read in albany block groups, from the precompiled bundle when the shapefile has not changed
+    jurisdiction = bundle.load_bundle(albany_bg_shapefile_path)
+    g = jurisdiction.graph()
+    gdf = jurisdiction.geodataframe()
     
-    # make updaters
-    updaters = {col_name: gc.updaters.Tally(col_name) for col_name in gdf.columns if 'cvap' in col_name}
-
-    updaters.update({col_name: gc.updaters.Tally(col_name) for col_name in gdf.columns if 'house' in col_name and 'tot' not in col_name})
-
-    updaters.update({col_name: gc.updaters.Tally(col_name) for col_name in gdf.columns if 'income' in col_name and 'tot' not in col_name})
+    # make updaters, the chain only needs the balance column, the stats of the unique plans are computed
+    # from their assignments by stats.calc_ensemble_stats
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
 
     # make constraints
-    unequal_size_constraint = functools.partial(unequal_size_constraint_template,
-                                                lower_bound_prop=small_district_lower_bound_prop, 
-                                                upper_bound_prop=small_district_upper_bound_prop)
-    unequal_size_constraint.__name__ = 'unequal_size_constraint'
-
-    # make initial assignment
-    total_pop = sum(gdf['cvap_total'])
-    equal_proportions_size = total_pop/2
-
-    good_initial_partition = False
-    while not good_initial_partition:
-        
-        initial_assignment = gc_tree.recursive_tree_part(g, parts=[1, 2], pop_target=equal_proportions_size, pop_col='cvap_total', epsilon=50)
-        
-        initial_partition = gc.GeographicPartition(g, assignment=initial_assignment, updaters=updaters)
-
-        if unequal_size_constraint(initial_partition):
-            good_initial_partition = True
-
-    percs = {k: 100*v/total_pop for k, v in initial_partition['cvap_total'].items()}
-    print(f'initial partition {percs}')
-
-    # make chain
-    proposal = functools.partial(proposals.recom, pop_col="cvap_total", pop_target=equal_proportions_size, epsilon=50, node_repeats=10)
-
-    chain = gc.MarkovChain(
-        proposal=proposal,
-        constraints=[unequal_size_constraint, constraints.contiguous],
-        accept=accept.always_accept,
-        initial_state=initial_partition,
-        total_steps=n_iter
-    )
+    unequal_size_constraint = make_unequal_size_constraint(small_district_lower_bound_prop, small_district_upper_bound_prop)
 
     # get unique partitions
-    unique_partitions = filter_unique_partitions(chain)
-    print(f'{len(unique_partitions)} unique partitions')
+    chain_telemetry = None
+    if method == 'enumerate':
+        unique_partitions = enumeration.enumerate_partitions(g, 'cvap_total', 
+                                                             small_district_lower_bound_prop, 
+                                                             small_district_upper_bound_prop, 
+                                                             updaters)
+    elif method == 'zdd':
+        diagram = zdd.build_plan_diagram(g, 'cvap_total', small_district_lower_bound_prop, small_district_upper_bound_prop)
+        print(f'{diagram.count()} valid plans')
+
+        unique_partitions = dedup.iter_unique_partitions(zdd.sample_partitions(g, diagram, n_iter, updaters))
+    elif method == 'ensemble':
+        n_chains = n_chains or os.cpu_count()
+        seeds = ensemble.make_seeds(n_chains, base_seed)
+        chain_n_iter = math.ceil(n_iter / n_chains)
+
+        keys, chain_summaries = ensemble.run_ensemble(albany_bg_shapefile_path, 
+                                                      seeds, 
+                                                      small_district_lower_bound_prop, 
+                                                      small_district_upper_bound_prop, 
+                                                      chain_n_iter, 
+                                                      proposal_engine=proposal_engine)
+
+        chain_seeds_df = pd.DataFrame({
+            'chain': range(n_chains), 
+            'seed': seeds, 
+            'n_iter': chain_n_iter, 
+            'n_unique': [chain_summary['n_unique'] for chain_summary in chain_summaries],
+            'accepted': [chain_summary['accepted'] for chain_summary in chain_summaries],
+            'rejected': [chain_summary['rejected'] for chain_summary in chain_summaries],
+            'self_loops': [chain_summary['self_loops'] for chain_summary in chain_summaries],
+            'steps_per_second': [chain_summary['steps_per_second'] for chain_summary in chain_summaries]
+        })
+        chain_seeds_df.to_csv(chain_seeds_path, index=False)
+
+        print(f"{chain_seeds_df['accepted'].sum()} steps accepted ({chain_seeds_df['self_loops'].sum()} self loops), "
+              f"{chain_seeds_df['rejected'].sum()} proposals rejected across {n_chains} chains")
+
+        encoder = dedup.PlanKeyEncoder(g)
+        unique_partitions = [enumeration.partition_from_small_district(g, encoder.decode(key), updaters) for key in keys]
+    else:
+        chain_telemetry = telemetry.ChainTelemetry(telemetry_path, sample_every=telemetry_sample_every, slow_step_seconds=slow_step_seconds)
+        chain = make_chain(g, updaters, unequal_size_constraint, n_iter, proposal_engine=proposal_engine, chain_telemetry=chain_telemetry)
+
+        seen = set()
+        unique_partitions = dedup.iter_unique_partitions(chain_telemetry.iter_steps(chain, seen=seen), seen=seen)
 
     # rename income groups dict
     acs_income_col = pd.read_csv(acs_incomedist_col_path)
     acs_income_col_dict = {row['renamed']: row['original'] for _, row in acs_income_col.iterrows()}
 
-    # plot chain test
-    all_partition_stats = []
-    for partition_idx, partition in enumerate(unique_partitions):
-        
-        partition_info = reorganize_partition_info(partition, n_district_electeds=n_district_electeds)
-        partition_stats = calc_partition_stats(partition_idx, partition_info, gdf)
+    partition_infos = [reorganize_partition_info(partition, n_district_electeds=n_district_electeds) 
+                       for partition in unique_partitions]
+    print(f'{len(partition_infos)} unique partitions')
+    if chain_telemetry is not None:
+        chain_telemetry.write_summary(telemetry_summary_path)
+        print(chain_telemetry.describe())
+
+    # calculate stats for all partitions at once
+    assignments = stats.assignment_matrix(partition_infos, gdf['GEOID'])
+    all_stats_df = stats.calc_ensemble_stats(assignments, gdf, n_district_electeds)
+
+    all_stats_df['LD_income_range_at_quota'] = all_stats_df['LD_income_range_at_quota'].map(acs_income_col_dict)
+    all_stats_df['SD_income_range_at_quota'] = all_stats_df['SD_income_range_at_quota'].map(acs_income_col_dict)
+
+    # cluster similar plans, the medoid of each cluster stands in for the rest
+    if n_representatives:
+        node_weights = gdf[representative_weight_col].to_numpy() if representative_weight_col else None
+        representatives_df, clusters = representatives.select_representatives(assignments, all_stats_df['map_id'], 
+                                                                               n_representatives, node_weights=node_weights)
+        representatives_df.to_csv(representatives_path, index=False)
+        print(f'{len(representatives_df)} representative partitions')
+
+        all_stats_df['cluster'] = clusters
+        is_representative = all_stats_df['map_id'].isin(representatives_df['map_id']).to_numpy()
+        summary_stats_df = all_stats_df[is_representative].merge(representatives_df[['map_id', 'cluster_size']], on='map_id')
+    else:
+        is_representative = np.ones(len(all_stats_df), dtype=bool)
+        summary_stats_df = all_stats_df
+
+    # geometry once plus bit packed assignments, drawn in the browser
+    web_output.write_web_output(assignments, all_stats_df.round(2), gdf, output_dir, title=output_dir.name)
+    lazy_render.write_run_info(output_dir, n_district_electeds)
 
-        tmp = partition_stats['LD_income_range_at_quota'].item()
-        partition_stats['LD_income_range_at_quota'] = acs_income_col_dict[tmp]
+    # indexed stats for query_plans.py, unrounded
+    plan_store.write_plan_store(all_stats_df, assignments, gdf['GEOID'], plan_store_path)
 
-        tmp = partition_stats['SD_income_range_at_quota'].item()
-        partition_stats['SD_income_range_at_quota'] = acs_income_col_dict[tmp]
+    if render_pngs:
+        # basemap seeded once, workers decode it when they start
+        bm.ensure_basemap(gdf, basemap_path)
 
-        plot.plot_partition(partition_info, gdf, map_output_dir / f'{partition_idx}_map.png')
-        plot.plot_partition_stats(partition_info, partition_stats, gdf, map_output_dir / f'{partition_idx}_map_stats.png')
+        # plot chain test, every worker loads the geometry once and renders maps until the queue is empty
+        render_failures = render_pool.render_partitions(assignments[is_representative], all_stats_df[is_representative], map_output_dir, 
+                                                        albany_bg_shapefile_path, basemap_path, n_district_electeds, 
+                                                        render_mode=render_mode, n_workers=n_render_workers)
 
-        all_partition_stats.append(partition_stats)
+        for map_id, error in sorted(render_failures.items()):
+            print(f'map {map_id} failed to render\n{error}')
 
-    all_stats_df = pd.concat(all_partition_stats)
     all_stats_df = all_stats_df.round()
     all_stats_df.to_csv(map_stats_path, index=False)
 
-    plot.plot_chain_summary(all_stats_df, map_summary_plot_path)
\ No newline at end of file
+    plot.plot_chain_summary(summary_stats_df.round(), map_summary_plot_path, weight_col='cluster_size' if n_representatives else None)
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Shared fixtures for the generate_maps tests: small synthetic grids of block groups.
+
+The scripts import each other as top level modules, pytest puts this directory on sys.path for them.
+"""
+import numpy as np
+import geopandas as gpd
+import shapely.geometry
+
+import gerrychain as gc
+
+# draws maps into data/albany/district_maps, not a test
+collect_ignore = ['test_recursive_tree_part.py']
+
+CVAP_COLUMNS = ['cvap_W', 'cvap_AA', 'cvap_A', 'cvap_L', 'cvap_NA', 'cvap_NH',
+                'cvap_NA+AA', 'cvap_NA+W', 'cvap_A+W', 'cvap_AA+W', 'cvap_rest']
+INCOME_COLUMNS = ['income_00_10k', 'income_10_50k', 'income_50_100k', 'income_100k_up']
+
+def grid_geodataframe(n_rows: int, n_cols: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """
+    Return n_rows x n_cols unit square block groups with random cvap, house and income columns.
+    """
+
+    rng = np.random.default_rng(seed)
+    n_nodes = n_rows * n_cols
+
+    gdf = gpd.GeoDataFrame({
+        'GEOID': [f'06001{idx:07d}' for idx in range(n_nodes)],
+        'geometry': [shapely.geometry.box(col, row, col + 1, row + 1) for row in range(n_rows) for col in range(n_cols)],
+    }, crs='EPSG:3310')
+
+    for col in CVAP_COLUMNS:
+        gdf[col] = rng.integers(0, 100, n_nodes)
+    gdf['cvap_total'] = gdf[CVAP_COLUMNS].sum(axis=1) + 1
+    gdf['cvap_not_L'] = gdf['cvap_total'] - gdf['cvap_L']
+
+    gdf['house_own'] = rng.integers(1, 50, n_nodes)
+    gdf['house_rent'] = rng.integers(1, 50, n_nodes)
+    gdf['house_tot'] = gdf['house_own'] + gdf['house_rent']
+
+    for col in INCOME_COLUMNS:
+        gdf[col] = rng.integers(1, 30, n_nodes)
+
+    return gdf
+
+def grid_graph(n_rows: int, n_cols: int, seed: int = 0) -> gc.Graph:
+    """
+    Return the rook adjacency dual graph of grid_geodataframe.
+    """
+
+    return gc.Graph.from_geodataframe(grid_geodataframe(n_rows, n_cols, seed=seed))
@@ -0,0 +1,80 @@
+"""
+Streaming deduplication of two district plans using bitset keys.
+"""
+from typing import (FrozenSet, Iterable, Iterator, Optional, Set, Tuple)
+
+import networkx as nx
+
+import gerrychain as gc
+
+class PlanKeyEncoder:
+    """
+    Encode two district plans as integer bitsets of the small district nodes.
+
+    Bit i is set when the i-th node in sorted order is in the small district, so the key is the same
+    whichever label the small district has. When both districts have the same population the district
+    not containing the lowest ordered node is used, matching enumeration.enumerate_small_districts.
+    """
+
+    def __init__(self, graph: nx.Graph, pop_col: str = 'cvap_total') -> None:
+
+        self.nodes = sorted(graph.nodes)
+        self.bits = {node: 1 << idx for idx, node in enumerate(self.nodes)}
+        self.full = (1 << len(self.nodes)) - 1
+        self.pop_col = pop_col
+
+    def encode(self, partition: gc.Partition) -> int:
+        """
+        Return the bitset key of the partition's small district.
+        """
+
+        district_pop = partition[self.pop_col]
+        small_district_id = 1 if district_pop[1] < district_pop[2] else 2
+
+        bits = self.bits
+        key = sum(bits[node] for node in partition.parts[small_district_id])
+
+        if district_pop[1] == district_pop[2] and key & 1:
+            key = self.full ^ key
+
+        return key
+
+    def decode(self, key: int) -> FrozenSet:
+        """
+        Return the small district nodes of a key.
+        """
+
+        return frozenset(node for idx, node in enumerate(self.nodes) if key >> idx & 1)
+
+def iter_unique_plans(chain: Iterable[gc.Partition],
+                      encoder: Optional[PlanKeyEncoder] = None,
+                      seen: Optional[Set[int]] = None) -> Iterator[Tuple[int, gc.Partition]]:
+    """
+    Yield the key and partition of each plan of the chain the first time it appears.
+
+    Only the set of keys is kept, so memory grows with the number of unique plans but not with the
+    length of the chain. Pass seen to share keys between chains or to read them back afterwards.
+    """
+
+    if seen is None:
+        seen = set()
+
+    for partition in chain:
+
+        if encoder is None:
+            encoder = PlanKeyEncoder(partition.graph)
+
+        key = encoder.encode(partition)
+        if key not in seen:
+            seen.add(key)
+            yield key, partition
+
+def iter_unique_partitions(chain: Iterable[gc.Partition],
+                           encoder: Optional[PlanKeyEncoder] = None,
+                           seen: Optional[Set[int]] = None) -> Iterator[gc.Partition]:
+    """
+    Yield each partition of the chain the first time its plan appears.
+    """
+
+    for _, partition in iter_unique_plans(chain, encoder=encoder, seen=seen):
+        yield partition
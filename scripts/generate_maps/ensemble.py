@@ -0,0 +1,80 @@
+"""
+Functions for running several independently seeded ReCom chains in a process pool and merging their unique plans.
+"""
+from typing import (Dict, List, Optional, Tuple)
+
+import concurrent.futures
+import random
+
+import numpy as np
+
+import gerrychain as gc
+
+import common
+import dedup
+import bundle
+import telemetry
+
+def make_seeds(n_chains: int, base_seed: int) -> List[int]:
+    """
+    Derive independent chain seeds from one base seed.
+    """
+
+    seed_sequences = np.random.SeedSequence(base_seed).spawn(n_chains)
+
+    return [int(seed_sequence.generate_state(1)[0]) for seed_sequence in seed_sequences]
+
+def run_chain(shapefile_path: str,
+              seed: int,
+              lower_bound_prop: float,
+              upper_bound_prop: float,
+              n_iter: int,
+              proposal_engine: str = 'gerrychain') -> Tuple[List[int], Dict]:
+    """
+    Run one seeded chain and return the dedup.PlanKeyEncoder key of each unique plan in discovery order
+    and the telemetry.ChainTelemetry summary of the chain, with its accepted, rejected and self loop counts.
+
+    Only cvap_total is tallied, since the chain only needs it for the constraint and deduplication.
+    """
+
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    g = bundle.load_bundle(shapefile_path).graph()
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+
+    unequal_size_constraint = common.make_unequal_size_constraint(lower_bound_prop, upper_bound_prop)
+
+    chain_telemetry = telemetry.ChainTelemetry()
+    chain = common.make_chain(g, updaters, unequal_size_constraint, n_iter, proposal_engine=proposal_engine, chain_telemetry=chain_telemetry)
+
+    seen = set()
+    keys = [key for key, _ in dedup.iter_unique_plans(chain_telemetry.iter_steps(chain, seen=seen), encoder=dedup.PlanKeyEncoder(g), seen=seen)]
+
+    return keys, chain_telemetry.summary
+
+def run_ensemble(shapefile_path: str,
+                 seeds: List[int],
+                 lower_bound_prop: float,
+                 upper_bound_prop: float,
+                 n_iter: int,
+                 proposal_engine: str = 'gerrychain',
+                 n_workers: Optional[int] = None) -> Tuple[List[int], List[Dict]]:
+    """
+    Run one chain of n_iter steps per seed in a process pool and merge their unique plans.
+
+    Plans are merged in seed order, so a fixed list of seeds always gives the same plans in the same
+    order. Returns the unique plan keys and the telemetry summary of each chain, see run_chain.
+    """
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = [executor.submit(run_chain, shapefile_path, seed, lower_bound_prop, upper_bound_prop, n_iter, proposal_engine)
+                   for seed in seeds]
+        chain_results = [future.result() for future in futures]
+
+    merged = {}
+    for chain_keys, _ in chain_results:
+        for key in chain_keys:
+            merged.setdefault(key, None)
+
+    return list(merged), [chain_summary for _, chain_summary in chain_results]
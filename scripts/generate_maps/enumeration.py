@@ -0,0 +1,107 @@
+"""
+Functions for exhaustively enumerating two district plans on small graphs.
+"""
+from typing import (Dict, FrozenSet, Iterator, List)
+
+import networkx as nx
+
+import gerrychain as gc
+
+def iter_connected_subsets(graph: nx.Graph, pop_col: str, min_pop: float, max_pop: float) -> Iterator[FrozenSet]:
+    """
+    Yield every connected set of nodes whose population is between min_pop and max_pop.
+
+    Each set is grown from its lowest ordered node, so every set is yielded exactly once. Populations
+    are non-negative, so a branch is pruned as soon as it goes over max_pop.
+    """
+
+    nodes = sorted(graph.nodes)
+    order = {node: idx for idx, node in enumerate(nodes)}
+    pops = {node: graph.nodes[node][pop_col] for node in nodes}
+
+    def grow(subset, subset_pop, candidates, forbidden):
+
+        if subset_pop >= min_pop:
+            yield frozenset(subset)
+
+        candidates = list(candidates)
+        forbidden = set(forbidden)
+        while candidates:
+            node = candidates.pop()
+            forbidden.add(node)
+
+            new_pop = subset_pop + pops[node]
+            if new_pop > max_pop:
+                continue
+
+            new_candidates = candidates + [n for n in graph.neighbors(node)
+                                           if n not in subset and n not in forbidden and n not in candidates]
+            yield from grow(subset | {node}, new_pop, new_candidates, forbidden)
+
+    for root in nodes:
+        if pops[root] > max_pop:
+            continue
+
+        forbidden = {n for n in nodes if order[n] < order[root]}
+        candidates = [n for n in graph.neighbors(root) if n not in forbidden]
+        yield from grow({root}, pops[root], candidates, forbidden | {root})
+
+def enumerate_small_districts(graph: nx.Graph, pop_col: str, lower_bound_prop: float, upper_bound_prop: float) -> List[FrozenSet]:
+    """
+    Return the node sets of every small district that makes a valid two district plan.
+
+    A plan is valid when both districts are connected and the smallest district is between the
+    proportion bounds, matching unequal_size_constraint_template. When both districts have the same
+    population only the district not containing the lowest ordered node is returned.
+
+    graph - a networkx or gerrychain graph
+    pop_col - node attribute used for population
+    lower_bound_prop - float between 0 and 1
+    upper_bound_prop - float between 0 and 1
+    """
+
+    nodes = sorted(graph.nodes)
+    total = sum(graph.nodes[n][pop_col] for n in nodes)
+
+    min_pop = lower_bound_prop * total
+    max_pop = min(upper_bound_prop * total, total / 2)
+
+    small_districts = []
+    for subset in iter_connected_subsets(graph, pop_col, min_pop, max_pop):
+
+        if len(subset) == len(nodes):
+            continue
+
+        subset_pop = sum(graph.nodes[n][pop_col] for n in subset)
+        if 2 * subset_pop == total and nodes[0] in subset:
+            continue
+
+        complement = [n for n in nodes if n not in subset]
+        if not nx.is_connected(graph.subgraph(complement)):
+            continue
+
+        small_districts.append(subset)
+
+    return small_districts
+
+def partition_from_small_district(graph: gc.Graph, small_district_nodes: FrozenSet, updaters: Dict) -> gc.Partition:
+    """
+    Make a partition with the small district as district 2 and the rest of the graph as district 1.
+    """
+
+    assignment = {n: 2 if n in small_district_nodes else 1 for n in graph.nodes}
+
+    return gc.GeographicPartition(graph, assignment=assignment, updaters=updaters)
+
+def enumerate_partitions(graph: gc.Graph,
+                         pop_col: str,
+                         lower_bound_prop: float,
+                         upper_bound_prop: float,
+                         updaters: Dict) -> List[gc.Partition]:
+    """
+    Return a partition for every valid two district plan of the graph.
+    """
+
+    small_districts = enumerate_small_districts(graph, pop_col, lower_bound_prop, upper_bound_prop)
+
+    return [partition_from_small_district(graph, nodes, updaters) for nodes in small_districts]
@@ -0,0 +1,249 @@
+"""
+Array backed ReCom proposal working on a compressed sparse row (CSR) adjacency.
+"""
+from typing import (Dict, Tuple)
+
+import abc
+import random
+
+import numpy as np
+import networkx as nx
+
+import gerrychain as gc
+
+class CSRGraph:
+    """
+    Adjacency of a graph in compressed sparse row form with a population vector.
+
+    Nodes are indexed in sorted order. The neighbors of node i are indices[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, graph: nx.Graph, pop_col: str) -> None:
+
+        self.nodes = sorted(graph.nodes)
+        self.index = {node: idx for idx, node in enumerate(self.nodes)}
+
+        degrees = [graph.degree(node) for node in self.nodes]
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(degrees)
+        self.indices = np.array([self.index[u] for node in self.nodes for u in sorted(graph.neighbors(node))],
+                                dtype=np.int64)
+
+        self.pops = np.array([graph.nodes[node][pop_col] for node in self.nodes], dtype=float)
+
+        # python lists are much faster to index one element at a time in the random walk
+        self._indptr_list = self.indptr.tolist()
+        self._indices_list = self.indices.tolist()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def assignment_array(self, assignment: Dict) -> np.ndarray:
+        """
+        Return the district of every node as an integer array in node index order.
+        """
+
+        return np.fromiter((assignment[node] for node in self.nodes), dtype=np.int64, count=len(self.nodes))
+
+    def wilson_tree(self, in_region: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Draw a uniform spanning tree of the region with Wilson's algorithm.
+
+        Returns the parent (-1 for the root and nodes outside the region) and depth of every node and
+        the root index.
+        """
+
+        indptr = self._indptr_list
+        indices = self._indices_list
+        region = np.flatnonzero(in_region).tolist()
+        region_mask = in_region.tolist()
+
+        parent = [-1] * len(self.nodes)
+        depth = [0] * len(self.nodes)
+        in_tree = [False] * len(self.nodes)
+        next_node = [-1] * len(self.nodes)
+
+        root = random.choice(region)
+        in_tree[root] = True
+
+        random.shuffle(region)
+        for start in region:
+
+            # loop erased random walk until the tree is hit
+            u = start
+            while not in_tree[u]:
+                lo = indptr[u]
+                deg = indptr[u + 1] - lo
+                v = indices[lo + int(random.random() * deg)]
+                while not region_mask[v]:
+                    v = indices[lo + int(random.random() * deg)]
+                next_node[u] = v
+                u = v
+
+            path = []
+            u = start
+            while not in_tree[u]:
+                path.append(u)
+                u = next_node[u]
+
+            for u in reversed(path):
+                in_tree[u] = True
+                parent[u] = next_node[u]
+                depth[u] = depth[next_node[u]] + 1
+
+        return np.array(parent, dtype=np.int64), np.array(depth, dtype=np.int64), root
+
+    def subtree_pops(self, in_region: np.ndarray, parent: np.ndarray, depth: np.ndarray) -> Tuple[np.ndarray, list]:
+        """
+        Return the population below every node of the tree and the region nodes grouped by depth.
+        """
+
+        region = np.flatnonzero(in_region)
+        region = region[np.argsort(depth[region], kind='stable')]
+        splits = np.flatnonzero(np.diff(depth[region])) + 1
+        levels = np.split(region, splits)
+
+        subtree = np.where(in_region, self.pops, 0.0)
+        for level in reversed(levels[1:]):
+            np.add.at(subtree, parent[level], subtree[level])
+
+        return subtree, levels
+
+class TreeCutRecom(abc.ABC):
+    """
+    ReCom proposal on a CSRGraph that can be passed to gc.MarkovChain in place of proposals.recom.
+
+    Subclasses choose which spanning tree edges are acceptable cuts with balanced_cuts.
+    """
+
+    def __init__(self, graph: nx.Graph, pop_col: str, max_attempts: int = 10_000) -> None:
+
+        self.csr = CSRGraph(graph, pop_col)
+        self.max_attempts = max_attempts
+
+        self._assignment_cache = {}
+
+    def _assignment(self, partition: gc.Partition) -> np.ndarray:
+
+        cached = self._assignment_cache.get(id(partition))
+        if cached is not None and cached[0] is partition:
+            return cached[1]
+
+        return self.csr.assignment_array(partition.assignment)
+
+    def _remember(self, partition: gc.Partition, assignment: np.ndarray) -> None:
+
+        # only the current state and the latest proposal are ever asked for again
+        if len(self._assignment_cache) >= 2:
+            self._assignment_cache.pop(next(iter(self._assignment_cache)))
+        self._assignment_cache[id(partition)] = (partition, assignment)
+
+    @abc.abstractmethod
+    def balanced_cuts(self, subtree: np.ndarray, region_pop: float, in_region: np.ndarray, root: int) -> np.ndarray:
+        """
+        Return the nodes whose edge to their parent is an acceptable cut.
+        """
+
+    def bipartition(self, in_region: np.ndarray) -> np.ndarray:
+        """
+        Split the region in two along a balanced cut of a random spanning tree.
+
+        Returns a boolean array marking the nodes on the subtree side of the cut.
+        """
+
+        region_pop = self.csr.pops[in_region].sum()
+
+        for _ in range(self.max_attempts):
+            parent, depth, root = self.csr.wilson_tree(in_region)
+            subtree, levels = self.csr.subtree_pops(in_region, parent, depth)
+
+            cuts = self.balanced_cuts(subtree, region_pop, in_region, root)
+            if len(cuts) == 0:
+                continue
+
+            cut = cuts[int(random.random() * len(cuts))]
+
+            in_subtree = np.zeros(len(self.csr), dtype=bool)
+            in_subtree[cut] = True
+            for level in levels[depth[cut] + 1:]:
+                in_subtree[level] |= in_subtree[parent[level]]
+
+            return in_subtree
+
+        raise RuntimeError(f'Could not find a possible cut after {self.max_attempts} attempts.')
+
+    def __call__(self, partition: gc.Partition) -> gc.Partition:
+
+        assignment = self._assignment(partition)
+
+        edge = random.choice(tuple(partition['cut_edges']))
+        parts_to_merge = (partition.assignment[edge[0]], partition.assignment[edge[1]])
+
+        in_region = (assignment == parts_to_merge[0]) | (assignment == parts_to_merge[1])
+        in_subtree = self.bipartition(in_region)
+
+        new_assignment = assignment.copy()
+        new_assignment[in_region] = parts_to_merge[1]
+        new_assignment[in_subtree] = parts_to_merge[0]
+
+        changed = np.flatnonzero(new_assignment != assignment)
+        flips = {self.csr.nodes[idx]: int(new_assignment[idx]) for idx in changed}
+
+        proposed = partition.flip(flips)
+        self._remember(partition, assignment)
+        self._remember(proposed, new_assignment)
+
+        return proposed
+
+class ArrayRecom(TreeCutRecom):
+    """
+    TreeCutRecom with gerrychain's cut balance: both sides of the cut must be within epsilon * pop_target
+    of pop_target.
+    """
+
+    def __init__(self, graph: nx.Graph, pop_col: str, pop_target: float, epsilon: float, max_attempts: int = 10_000) -> None:
+
+        super().__init__(graph, pop_col, max_attempts=max_attempts)
+        self.pop_target = pop_target
+        self.epsilon = epsilon
+
+    def balanced_cuts(self, subtree: np.ndarray, region_pop: float, in_region: np.ndarray, root: int) -> np.ndarray:
+        """
+        Return the nodes whose edge to their parent is a balanced cut.
+        """
+
+        tolerance = self.epsilon * self.pop_target
+        balanced = (np.abs(subtree - self.pop_target) < tolerance) & (np.abs(region_pop - subtree - self.pop_target) < tolerance)
+        balanced &= in_region
+        balanced[root] = False
+
+        return np.flatnonzero(balanced)
+
+class UnequalRecom(TreeCutRecom):
+    """
+    TreeCutRecom for two unequal districts that only cuts where the smaller side holds between
+    lower_bound_prop and upper_bound_prop of the total population.
+
+    Every proposal then satisfies unequal_size_constraint_template, so the chain wastes no steps on
+    rejected plans.
+    """
+
+    def __init__(self, graph: nx.Graph, pop_col: str, lower_bound_prop: float, upper_bound_prop: float, max_attempts: int = 10_000) -> None:
+
+        super().__init__(graph, pop_col, max_attempts=max_attempts)
+
+        self.total_pop = self.csr.pops.sum()
+        self.lower_bound_prop = lower_bound_prop
+        self.upper_bound_prop = upper_bound_prop
+
+    def balanced_cuts(self, subtree: np.ndarray, region_pop: float, in_region: np.ndarray, root: int) -> np.ndarray:
+        """
+        Return the nodes whose edge to their parent leaves the smaller side inside the proportion bounds.
+        """
+
+        small_prop = np.minimum(subtree, region_pop - subtree) / self.total_pop
+        balanced = (small_prop >= self.lower_bound_prop) & (small_prop <= self.upper_bound_prop)
+        balanced &= in_region
+        balanced[root] = False
+
+        return np.flatnonzero(balanced)
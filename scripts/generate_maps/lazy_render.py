@@ -0,0 +1,209 @@
+"""
+Render map PNGs only when they are asked for, caching them under a hash of the plan and its stats so the
+same plan in different runs or scenarios shares one image.
+"""
+from typing import (Dict, List, Optional, Tuple)
+
+import functools
+import hashlib
+import http.server
+import json
+import os
+import pathlib
+import re
+import shutil
+import traceback
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+
+import bundle
+import basemap as bm
+import plot_templates
+import render_pool
+import stats
+
+# bump when the figures change so old cached images are not reused
+RENDER_VERSION = 2
+
+RUN_INFO_NAME = 'run_info.json'
+
+def image_key(kind: str, 
+              geoids: List[str], 
+              assignment: np.ndarray, 
+              stats_row: Optional[Dict] = None, 
+              n_district_electeds: Optional[List[int]] = None) -> str:
+    """
+    Hash the image kind, the small district GEOIDs, the stats and the seats per district shown in the image.
+
+    map_id is left out of the stats, since the same plan gets different ids in different runs.
+    """
+
+    h = hashlib.sha256()
+    h.update(f'{RENDER_VERSION};{kind};'.encode())
+    h.update(';'.join(sorted(geoid for geoid, district in zip(geoids, assignment.tolist()) if district == 2)).encode())
+
+    if stats_row is not None:
+        shown_stats = {k: v for k, v in stats_row.items() if k != 'map_id'}
+        h.update(json.dumps(shown_stats, sort_keys=True, default=str).encode())
+
+    # the map_stats title and quota lines depend on the seats of each district
+    if n_district_electeds is not None:
+        h.update(json.dumps(list(n_district_electeds)).encode())
+
+    return h.hexdigest()
+
+class ImageCache:
+    """
+    Content addressed store of rendered map images, rendering missing ones with the figure templates.
+    """
+
+    def __init__(self, cache_dir: str, shapefile_path: str, basemap_path: str) -> None:
+
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.shapefile_path = shapefile_path
+        self.basemap_path = basemap_path
+
+        self._gdf = None
+        self._basemap = None
+        self._templates = {}
+
+    @property
+    def gdf(self):
+        if self._gdf is None:
+            self._gdf = bundle.load_bundle(self.shapefile_path).geodataframe()
+        return self._gdf
+
+    def template(self, kind: str, n_district_electeds: Tuple[int, ...]):
+        """
+        Build each figure template the first time it is needed.
+        """
+
+        if self._basemap is None:
+            self._basemap = bm.load_basemap(self.gdf, self.basemap_path)
+
+        template_key = (kind, n_district_electeds if kind == 'map_stats' else None)
+        if template_key not in self._templates:
+            if kind == 'map':
+                self._templates[template_key] = plot_templates.PartitionMapTemplate(self.gdf, basemap=self._basemap)
+            else:
+                self._templates[template_key] = plot_templates.PartitionStatsTemplate(self.gdf, list(n_district_electeds), basemap=self._basemap)
+
+        return self._templates[template_key]
+
+    def image_path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / key[:2] / f'{key}.png'
+
+    def get(self, kind: str, assignment: np.ndarray, stats_row: Dict, n_district_electeds: List[int]) -> pathlib.Path:
+        """
+        Return the cached 'map' or 'map_stats' image of the plan, rendering it first if needed.
+
+        assignment - district ids in bundle row order
+        """
+
+        if kind not in ('map', 'map_stats'):
+            raise ValueError(f'unknown image kind {kind}')
+
+        geoids = self.gdf['GEOID'].tolist()
+        if kind == 'map_stats':
+            key = image_key(kind, geoids, assignment, stats_row, n_district_electeds)
+        else:
+            key = image_key(kind, geoids, assignment)
+        path = self.image_path(key)
+
+        if path.exists():
+            return path
+
+        partition_info = render_pool.partition_info_from_assignment(assignment, self.gdf, n_district_electeds)
+        template = self.template(kind, tuple(n_district_electeds))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.stem}.{os.getpid()}.tmp.png')
+        if kind == 'map':
+            template.render(partition_info, tmp_path)
+        else:
+            template.render(partition_info, pd.DataFrame([stats_row]), tmp_path)
+        os.replace(tmp_path, path)
+
+        return path
+
+def write_run_info(output_dir: pathlib.Path, n_district_electeds: List[int]) -> None:
+    """
+    Record what the lazy renderer needs besides assignments.bin to redraw a run's maps.
+    """
+
+    (output_dir / RUN_INFO_NAME).write_text(json.dumps({'n_district_electeds': list(n_district_electeds)}))
+
+class RunMaps:
+    """
+    The plans of one run_recom output directory, read from assignments.bin and run_info.json.
+    """
+
+    def __init__(self, output_dir: pathlib.Path, gdf: pd.DataFrame) -> None:
+
+        run_info = json.loads((output_dir / RUN_INFO_NAME).read_text())
+        self.n_district_electeds = run_info['n_district_electeds']
+
+        n_nodes = len(gdf)
+        packed = np.fromfile(output_dir / 'assignments.bin', dtype=np.uint8).reshape(-1, (n_nodes + 7) // 8)
+        self.assignments = (1 + np.unpackbits(packed, axis=1, count=n_nodes, bitorder='little')).astype(np.int8)
+
+        # stats are cheap to recompute exactly, map_stats.csv is rounded
+        self.stats_records = stats.calc_ensemble_stats(self.assignments, gdf, self.n_district_electeds).to_dict('records')
+
+class MapRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Serve files under the district maps directory, rendering <run>/maps/<map_id>_map[_stats].png on request.
+    """
+
+    image_pattern = re.compile(r'^/(?P<run>[^/]+)/maps/(?P<map_id>\d+)_(?P<kind>map|map_stats)\.png$')
+
+    def __init__(self, *args, image_cache: ImageCache, runs: Dict, **kwargs) -> None:
+
+        self.image_cache = image_cache
+        self.runs = runs
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:
+
+        match = self.image_pattern.match(self.path.split('?')[0])
+        if match is None:
+            return super().do_GET()
+
+        try:
+            run_dir = pathlib.Path(self.directory) / match['run']
+            if match['run'] not in self.runs:
+                self.runs[match['run']] = RunMaps(run_dir, self.image_cache.gdf)
+            run = self.runs[match['run']]
+
+            map_id = int(match['map_id'])
+            image_path = self.image_cache.get(match['kind'], run.assignments[map_id], run.stats_records[map_id], run.n_district_electeds)
+        except (FileNotFoundError, IndexError):
+            return self.send_error(404)
+        except Exception as error:
+            # answer with the error instead of dropping the connection, the server keeps running
+            self.log_error('rendering %s failed\n%s', self.path, traceback.format_exc())
+            return self.send_error(500, explain=f'{type(error).__name__}: {error}')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(image_path.stat().st_size))
+        self.end_headers()
+        with open(image_path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+def serve(district_maps_dir: str, image_cache: ImageCache, port: int = 8000) -> None:
+    """
+    Serve the run directories under district_maps_dir, e.g. http://localhost:8000/recom_3_2/explorer.html.
+
+    Single threaded, since matplotlib figures can not be drawn from several threads.
+    """
+
+    handler = functools.partial(MapRequestHandler, directory=str(district_maps_dir), image_cache=image_cache, runs={})
+
+    with http.server.HTTPServer(('localhost', port), handler) as server:
+        print(f'serving {district_maps_dir} on http://localhost:{port}')
+        server.serve_forever()
@@ -0,0 +1,246 @@
+"""
+Indexed, memory mapped store of an ensemble's stats table for fast filtering of plans.
+
+Numeric columns are kept with a sorted copy and its argsort, so a range predicate is two binary searches.
+Text columns such as SD_quadrant get a bitmap per value, and small district membership is kept as a bitset
+per plan and a bitmap of plans per block group. Predicates are answered as bitmaps over plans and ANDed.
+"""
+from typing import (Optional, Sequence)
+
+import pathlib
+import re
+
+import numpy as np
+import pandas as pd
+
+import bundle
+import web_output
+
+MAGIC = b'PLANSTR1'
+STORE_VERSION = 1
+
+STORE_NAME = 'plans.store'
+
+PREDICATE_PATTERN = re.compile(r'^\s*(?P<col>\w+)\s*(?P<op><=|>=|==|!=|<|>|contains)\s*(?P<value>.+?)\s*$')
+
+def packed_bitmap(rows: np.ndarray, n_plans: int) -> np.ndarray:
+    """
+    Return a bitmap over plans with the bits of rows set, little endian within a byte like assignments.bin.
+    """
+
+    bits = np.zeros(n_plans, dtype=bool)
+    bits[rows] = True
+
+    return np.packbits(bits, bitorder='little')
+
+def write_plan_store(stats_df: pd.DataFrame, assignments: np.ndarray, geoids: Sequence[str], store_path: str) -> None:
+    """
+    Write the stats table and small district membership of every plan to store_path.
+
+    assignments - (n_plans x n_nodes) array of district ids in geoids order, rows matching stats_df
+    LD_geoids and SD_geoids are not stored as text, they are rebuilt from the membership bitsets.
+    """
+
+    stats_df = stats_df.drop(columns=['LD_geoids', 'SD_geoids'], errors='ignore').reset_index(drop=True)
+    n_plans = len(stats_df)
+
+    numeric_cols = [col for col in stats_df.columns if pd.api.types.is_numeric_dtype(stats_df[col])]
+    text_cols = [col for col in stats_df.columns if col not in numeric_cols]
+
+    arrays = {}
+    numeric_columns = {}
+    for col in numeric_cols:
+        values = stats_df[col].to_numpy(dtype=float)
+        order = np.argsort(values, kind='stable')
+        arrays[f'values:{col}'] = values
+        arrays[f'order:{col}'] = order.astype(np.int64)
+        arrays[f'sorted:{col}'] = values[order]
+        # NaNs sort last and never match
+        numeric_columns[col] = {'dtype': str(stats_df[col].dtype), 'n_valid': int(np.count_nonzero(~np.isnan(values)))}
+
+    text_columns = {}
+    for col in text_cols:
+        codes, categories = pd.factorize(stats_df[col])
+        arrays[f'codes:{col}'] = codes.astype(np.int32)
+        arrays[f'bitmap:{col}'] = np.array([packed_bitmap(np.flatnonzero(codes == code), n_plans)
+                                            for code in range(len(categories))],
+                                           dtype=np.uint8).reshape(len(categories), (n_plans + 7) // 8)
+        text_columns[col] = [str(category) for category in categories]
+
+    # bitset of small district block groups per plan, and bitmap of plans per block group
+    small_district = assignments == 2
+    arrays['sd_bits'] = web_output.pack_assignments(assignments)
+    arrays['sd_bitmap'] = np.packbits(small_district.T, axis=1, bitorder='little')
+
+    header = {
+        'version': STORE_VERSION,
+        'n_plans': n_plans,
+        'geoids': list(geoids),
+        'column_order': list(stats_df.columns),
+        'numeric_columns': numeric_columns,
+        'text_columns': text_columns,
+    }
+
+    bundle.write_array_file(store_path, MAGIC, header, arrays)
+
+class PlanStore:
+    """
+    Read only view of a plan store, see write_plan_store.
+    """
+
+    def __init__(self, store_path: str) -> None:
+
+        try:
+            self.header, self.arrays = bundle.read_array_file(store_path, MAGIC)
+        except ValueError:
+            raise ValueError(f'{store_path} is not a plan store')
+
+        self.n_plans = self.header['n_plans']
+        self.geoids = self.header['geoids']
+        self.node_index = {geoid: idx for idx, geoid in enumerate(self.geoids)}
+        self.numeric_columns = self.header['numeric_columns']
+        self.text_columns = self.header['text_columns']
+
+        # bits past the last plan are never set in a result
+        self.all_plans = packed_bitmap(np.arange(self.n_plans), self.n_plans)
+
+    def __len__(self) -> int:
+        return self.n_plans
+
+    def range_bitmap(self, col: str, op: str, value: float) -> np.ndarray:
+        """
+        Return the bitmap of plans whose numeric column compares true against value.
+        """
+
+        sorted_values = self.arrays[f'sorted:{col}']
+        n_valid = self.numeric_columns[col]['n_valid']
+
+        left = int(np.searchsorted(sorted_values[:n_valid], value, side='left'))
+        right = int(np.searchsorted(sorted_values[:n_valid], value, side='right'))
+
+        bounds = {
+            '<': (0, left),
+            '<=': (0, right),
+            '>': (right, n_valid),
+            '>=': (left, n_valid),
+            '==': (left, right),
+            '!=': (left, right),
+        }
+        start, stop = bounds[op]
+        bitmap = packed_bitmap(self.arrays[f'order:{col}'][start:stop], self.n_plans)
+
+        if op == '!=':
+            bitmap = self.all_plans & ~bitmap & packed_bitmap(self.arrays[f'order:{col}'][:n_valid], self.n_plans)
+
+        return bitmap
+
+    def category_bitmap(self, col: str, op: str, value: str) -> np.ndarray:
+        """
+        Return the bitmap of plans whose text column equals (==) or differs from (!=) value.
+        """
+
+        if op not in ('==', '!='):
+            raise ValueError(f'{col} is a text column, only == and != are supported')
+
+        categories = self.text_columns[col]
+        bitmaps = self.arrays[f'bitmap:{col}']
+
+        if op == '==':
+            if value not in categories:
+                return np.zeros_like(self.all_plans)
+            return np.array(bitmaps[categories.index(value)])
+
+        other = [idx for idx, category in enumerate(categories) if category != value]
+        return np.bitwise_or.reduce(bitmaps[other], axis=0) if other else np.zeros_like(self.all_plans)
+
+    def membership_bitmap(self, district: str, geoid: str) -> np.ndarray:
+        """
+        Return the bitmap of plans with the block group in the 'SD' or 'LD' district.
+        """
+
+        if geoid not in self.node_index:
+            raise KeyError(f'unknown GEOID {geoid}')
+
+        bitmap = np.array(self.arrays['sd_bitmap'][self.node_index[geoid]])
+
+        if district == 'LD':
+            bitmap = self.all_plans & ~bitmap
+
+        return bitmap
+
+    def predicate_bitmap(self, predicate: str) -> np.ndarray:
+        """
+        Return the bitmap of plans matching one predicate.
+
+        Predicates are '<column> <op> <value>' with op one of < <= > >= == != for stats columns, e.g.
+        "SD_cvap_Asian_Alone_perc > 30" or "SD_quadrant == NE", or 'SD contains <GEOID>' and
+        'LD contains <GEOID>' for block group membership.
+        """
+
+        match = PREDICATE_PATTERN.match(predicate)
+        if match is None:
+            raise ValueError(f'can not parse predicate {predicate!r}')
+
+        col, op, value = match['col'], match['op'], match['value'].strip('\'"')
+
+        if op == 'contains':
+            if col not in ('LD', 'SD'):
+                raise ValueError(f'contains needs LD or SD, got {col}')
+            return self.membership_bitmap(col, value)
+
+        if col in self.numeric_columns:
+            return self.range_bitmap(col, op, float(value))
+
+        if col in self.text_columns:
+            return self.category_bitmap(col, op, value)
+
+        raise KeyError(f'unknown column {col}')
+
+    def query(self, predicates: Sequence[str]) -> np.ndarray:
+        """
+        Return the rows of the plans matching every predicate, in store order.
+        """
+
+        bitmap = self.all_plans.copy()
+        for predicate in predicates:
+            bitmap &= self.predicate_bitmap(predicate)
+
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_plans, bitorder='little'))
+
+    def stats(self, rows: Optional[np.ndarray] = None, geoids: bool = False) -> pd.DataFrame:
+        """
+        Return the stats table of the rows, all plans if None, with LD_geoids and SD_geoids if geoids is set.
+        """
+
+        rows = np.arange(self.n_plans) if rows is None else np.asarray(rows)
+
+        columns = {}
+        for col in self.header['column_order']:
+            if col in self.numeric_columns:
+                values = self.arrays[f'values:{col}'][rows]
+                dtype = self.numeric_columns[col]['dtype']
+                columns[col] = values.astype(dtype) if self.numeric_columns[col]['n_valid'] == self.n_plans else values
+            else:
+                categories = np.array(self.text_columns[col] + [None], dtype=object)
+                columns[col] = categories[self.arrays[f'codes:{col}'][rows]]
+
+        stats_df = pd.DataFrame(columns, columns=self.header['column_order'])
+
+        if geoids:
+            # sorted GEOIDs joined with ';', as in stats.calc_ensemble_stats
+            geoid_order = np.argsort(self.geoids)
+            sorted_geoids = np.array(self.geoids, dtype=object)[geoid_order]
+            small_district = np.unpackbits(self.arrays['sd_bits'][rows], axis=1, count=len(self.geoids), bitorder='little')
+            small_district = small_district[:, geoid_order].astype(bool)
+
+            stats_df['LD_geoids'] = [';'.join(sorted_geoids[~row]) for row in small_district]
+            stats_df['SD_geoids'] = [';'.join(sorted_geoids[row]) for row in small_district]
+
+        return stats_df
+
+def open_run(output_dir: pathlib.Path) -> PlanStore:
+    """
+    Open the plan store run_recom wrote to output_dir.
+    """
+
+    return PlanStore(pathlib.Path(output_dir) / STORE_NAME)
@@ -2,18 +2,25 @@
 Functions for plotting paritions from gerrychain
 """
 
-from typing import (Dict, Optional)
+from typing import (Dict, List, Optional)
 
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
-import contextily as cx
 
-def plot_partition(partition_info: Dict, geodataframe: gpd.GeoDataFrame, save_path: Optional[str] = None) -> None:
+import basemap as bm
+
+def plot_partition(partition_info: Dict, 
+                   geodataframe: gpd.GeoDataFrame, 
+                   save_path: Optional[str] = None, 
+                   basemap: Optional[bm.Basemap] = None) -> None:
     """
     Plot just the parition on the map.
+
+    basemap - preloaded basemap drawn instead of fetching tiles
     """
 
     assignment = partition_info['assignment']
@@ -37,7 +44,7 @@ def plot_partition(partition_info: Dict, geodataframe: gpd.GeoDataFrame, save_pa
         sub_gdf = plot_gdf.loc[plot_gdf['assignment'] == assign, :]
         sub_gdf.plot(ax=ax, color=district_colors[assign_idx], alpha=0.15)
         sub_gdf.plot(ax=ax, edgecolor=district_colors[assign_idx], linewidth=2, facecolor='none')
-    cx.add_basemap(ax, crs=geodataframe.crs.to_string())
+    bm.add_basemap(ax, geodataframe, basemap)
 
     if save_path:
         fig.savefig(save_path, dpi=dpi, format='png', transparent=False)
@@ -47,9 +54,12 @@ def plot_partition(partition_info: Dict, geodataframe: gpd.GeoDataFrame, save_pa
 def plot_partition_stats(partition_info: Dict, 
                          partition_stats: pd.DataFrame, 
                          geodataframe: gpd.GeoDataFrame, 
-                         save_path: Optional[str] = None) -> None:
+                         save_path: Optional[str] = None,
+                         basemap: Optional[bm.Basemap] = None) -> None:
     """
     Plot partition map and stats for single partition.
+
+    basemap - preloaded basemap drawn instead of fetching tiles
     """
 
     # reorganize data
@@ -234,7 +244,7 @@ def plot_partition_stats(partition_info: Dict,
         sub_gdf = plot_gdf.loc[plot_gdf['assignment'] == assign, :]
         sub_gdf.plot(ax=map_ax, color=district_colors[assign_idx], alpha=0.15)
         sub_gdf.plot(ax=map_ax, edgecolor=district_colors[assign_idx], linewidth=2, facecolor='none')
-    cx.add_basemap(map_ax, crs=geodataframe.crs.to_string())
+    bm.add_basemap(map_ax, geodataframe, basemap)
 
     map_ax.set_title(f'district sizes {sorted(partition_info["n_district_electeds"])}', fontsize=10)
 
@@ -395,20 +405,50 @@ def plot_partition_stats(partition_info: Dict,
 
     plt.close(fig)
 
-def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> None:
+def weighted_stripplot(ax: plt.Axes, data: pd.DataFrame, palette: List[str], jitter: float = 0.05) -> None:
+    """
+    Strip plot of a melted stats table with each marker's area scaled by its 'weight' column.
+    """
+
+    variables = list(dict.fromkeys(data['variable']))
+    sizes = 10 + 190 * data['weight'] / data['weight'].max()
+    rng = np.random.default_rng(0)
+
+    for idx, variable in enumerate(variables):
+        rows = data['variable'] == variable
+        x = idx + rng.uniform(-jitter, jitter, rows.sum())
+        ax.scatter(x, data.loc[rows, 'value'], s=sizes[rows], color=palette[idx % len(palette)], alpha=0.7, linewidths=0)
+
+    ax.set_xticks(range(len(variables)))
+    ax.set_xticklabels(variables)
+
+def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None, weight_col: Optional[str] = None) -> None:
     """
     Plot distribution of stats across all maps.
+
+    weight_col - column with the number of maps each row stands for, e.g. the cluster_size of representative
+                 maps from representatives.select_representatives. Counts are summed over it and strip plot
+                 markers sized by it.
     """
 
+    weights = df[weight_col] if weight_col else pd.Series(1, index=df.index)
+    weight_by_map = pd.Series(weights.to_numpy(), index=df['map_id'])
+
+    def count(col: str) -> pd.DataFrame:
+        return weights.groupby(df[col]).sum().sort_values(ascending=False).to_frame().reset_index()
+
+    def melt(cols: List[str]) -> pd.DataFrame:
+        melted = pd.melt(df.loc[:, ['map_id'] + cols], id_vars=['map_id'], value_vars=cols)
+        melted['weight'] = melted['map_id'].map(weight_by_map)
+        return melted
+
     # reorganize data
-    total_pop_df = df.loc[:, ['map_id', 'LD_cvap_total_perc', 'SD_cvap_total_perc']]
-    total_pop_df = pd.melt(total_pop_df, id_vars=['map_id'], value_vars=['LD_cvap_total_perc', 'SD_cvap_total_perc'])
+    total_pop_df = melt(['LD_cvap_total_perc', 'SD_cvap_total_perc'])
 
-    quadrant_df = df.loc[:, ['SD_quadrant']].value_counts().to_frame().reset_index()
+    quadrant_df = count('SD_quadrant')
     quadrant_df.columns = ['SD_quadrant', 'count']
 
-    renter_df = df.loc[:, ['map_id', 'LD_housing_rent_perc', 'SD_housing_rent_perc']]
-    renter_df = pd.melt(renter_df, id_vars=['map_id'], value_vars=['LD_housing_rent_perc', 'SD_housing_rent_perc'])
+    renter_df = melt(['LD_housing_rent_perc', 'SD_housing_rent_perc'])
 
     income_buckets = pd.DataFrame({
         'full_name': [
@@ -447,7 +487,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
             '>$200,000']
     })
 
-    ld_income_buckets_count = df.loc[:, ['LD_income_range_at_quota']].value_counts().to_frame().reset_index()
+    ld_income_buckets_count = count('LD_income_range_at_quota')
     ld_income_buckets_count.columns = ['LD_income_range_at_quota', 'count']
 
     for k in income_buckets['full_name']:
@@ -460,7 +500,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     ld_income_buckets_count['LD_income_range_at_quota'] = income_buckets['short_name']
     ld_income_buckets_count.columns = ['income_range', 'count']
 
-    sd_income_buckets_count = df.loc[:, ['SD_income_range_at_quota']].value_counts().to_frame().reset_index()
+    sd_income_buckets_count = count('SD_income_range_at_quota')
     sd_income_buckets_count.columns = ['SD_income_range_at_quota', 'count']
 
     for k in income_buckets['full_name']:
@@ -496,6 +536,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     ld_eth_alone_df = pd.melt(ld_eth_alone_df, 
                               id_vars=['map_id'], 
                               value_vars=eth_col_rename)
+    ld_eth_alone_df['weight'] = ld_eth_alone_df['map_id'].map(weight_by_map)
 
     sd_eth_alone_df = df.loc[:, [
         'map_id', 
@@ -510,6 +551,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     sd_eth_alone_df = pd.melt(sd_eth_alone_df, 
                               id_vars=['map_id'], 
                               value_vars=eth_col_rename)
+    sd_eth_alone_df['weight'] = sd_eth_alone_df['map_id'].map(weight_by_map)
                 
 
     ld_eth_combined_df = df.loc[:, [
@@ -525,6 +567,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     ld_eth_combined_df = pd.melt(ld_eth_combined_df, 
                               id_vars=['map_id'], 
                               value_vars=eth_col_rename)
+    ld_eth_combined_df['weight'] = ld_eth_combined_df['map_id'].map(weight_by_map)
 
     sd_eth_combined_df = df.loc[:, [
         'map_id', 
@@ -539,6 +582,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     sd_eth_combined_df = pd.melt(sd_eth_combined_df, 
                               id_vars=['map_id'], 
                               value_vars=eth_col_rename)
+    sd_eth_combined_df['weight'] = sd_eth_combined_df['map_id'].map(weight_by_map)
 
     dpi = 200
     fig_hw = (12, 10)
@@ -565,14 +609,23 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     # Create an array with the colors 
     colors = ["#7fbf7f", "#7f7fff"]
 
+    def stripplot(ax: plt.Axes, data: pd.DataFrame, palette: List[str]) -> None:
+        if weight_col:
+            weighted_stripplot(ax, data, palette)
+        elif len(palette) > 1:
+            sns_plot = sns.stripplot(ax=ax, x="variable", y="value", data=data, jitter=0.05, hue='variable', palette=palette)
+            sns_plot.get_legend().remove()
+        else:
+            sns.stripplot(ax=ax, x="variable", y="value", data=data, jitter=0.05, color=palette[0])
+
     # total pop
-    sns_plot = sns.stripplot(ax=total_pop_ax, x="variable", y="value", data=total_pop_df, jitter=0.05, hue='variable', palette=colors)
-    sns_plot.get_legend().remove()
+    stripplot(total_pop_ax, total_pop_df, colors)
 
     total_pop_ax.set_xlabel('')
     total_pop_ax.set_ylabel('percent')
     total_pop_ax.set_xticklabels(['Large District', 'Small District'])
-    total_pop_ax.set_title(f'Distribution of District Sizes (Percent) ({df.shape[0]} maps)', fontsize=10)
+    n_maps = f'{int(weights.sum())} maps, {df.shape[0]} shown' if weight_col else f'{df.shape[0]} maps'
+    total_pop_ax.set_title(f'Distribution of District Sizes (Percent) ({n_maps})', fontsize=10)
 
     # quandrant distribution
     quadrant_df.plot.bar(ax=quadrant_ax, x='SD_quadrant', y='count', legend=False, alpha=0.5, rot=0)
@@ -582,8 +635,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     quadrant_ax.set_xlabel('Small District Quadrant')
 
     # renter 
-    sns_plot = sns.stripplot(ax=renters_ax, x="variable", y="value", data=renter_df, jitter=0.05, hue='variable', palette=colors)
-    sns_plot.get_legend().remove()
+    stripplot(renters_ax, renter_df, colors)
 
     renters_ax.set_xlabel('')
     renters_ax.set_ylabel('percent')
@@ -591,7 +643,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     renters_ax.set_title('Distribution of District Renter Composition', fontsize=10)
 
     # ld eth alone
-    sns.stripplot(ax=ld_eth_alone_ax, x="variable", y="value", data=ld_eth_alone_df, jitter=0.05, color=colors[0])
+    stripplot(ld_eth_alone_ax, ld_eth_alone_df, [colors[0]])
 
     ld_eth_alone_ax.set_xlabel('')
     ld_eth_alone_ax.set_title('Large District\nDistribution of CVAP Ethnicity (Alone)', fontsize=10)
@@ -601,7 +653,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     ld_eth_alone_ax.tick_params(axis='x', which='major', labelsize=8)
 
     # sd eth alone
-    sns.stripplot(ax=sd_eth_alone_ax, x="variable", y="value", data=sd_eth_alone_df, jitter=0.05, color=colors[1])
+    stripplot(sd_eth_alone_ax, sd_eth_alone_df, [colors[1]])
 
     sd_eth_alone_ax.set_xlabel('')
     sd_eth_alone_ax.set_title('Small District\nDistribution of CVAP Ethnicity (Alone)', fontsize=10)
@@ -613,7 +665,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     sd_eth_alone_ax.tick_params(axis='x', which='major', labelsize=7)
 
     # ld eth combined
-    sns.stripplot(ax=ld_eth_combined_ax, x="variable", y="value", data=ld_eth_combined_df, jitter=0.05, color=colors[0])
+    stripplot(ld_eth_combined_ax, ld_eth_combined_df, [colors[0]])
 
     ld_eth_combined_ax.set_xlabel('')
     ld_eth_combined_ax.set_title('Large District\nDistribution of CVAP Ethnicity (Combined)', fontsize=10)
@@ -623,7 +675,7 @@ def plot_chain_summary(df: pd.DataFrame, save_path: Optional[str] = None) -> Non
     ld_eth_combined_ax.tick_params(axis='x', which='major', labelsize=8)
 
     # sd eth combined
-    sns.stripplot(ax=sd_eth_combined_ax, x="variable", y="value", data=sd_eth_combined_df, jitter=0.05, color=colors[1])
+    stripplot(sd_eth_combined_ax, sd_eth_combined_df, [colors[1]])
 
     sd_eth_combined_ax.set_xlabel('')
     sd_eth_combined_ax.set_title('Small District\nDistribution of CVAP Ethnicity (Combined)', fontsize=10)
@@ -0,0 +1,318 @@
+"""
+Reusable figures for plotting many partitions. The layout, labels and block group geometry are drawn once
+and each partition only updates district colors, bar heights and text.
+"""
+from typing import (Dict, List, Optional)
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba
+
+import basemap as bm
+
+DISTRICT_COLORS = ['g', 'b']
+
+ETHNICITY_LABELS = [
+    'Remaining',
+    'White',
+    'Asian',
+    'Hispanic or\nLatino',
+    'Black or African\nAmerican',
+    'American Indian\nor Alaska Native',
+    'Native Hawaiian\nor Other\nPacific Islander',
+]
+
+ETHNICITY_ALONE_COLUMNS = [
+    'cvap_Alone_Remaining_perc',
+    'cvap_White_Alone_perc',
+    'cvap_Asian_Alone_perc',
+    'cvap_Hispanic_or_Latino_Alone_perc',
+    'cvap_Black_or_African_American_Alone_perc',
+    'cvap_American_Indian_or_Alaska_Native_Alone_perc',
+    'cvap_Native_Hawaiian_or_Other_Pacific_Islander_Alone_perc',
+]
+
+ETHNICITY_COMBINED_COLUMNS = [
+    'cvap_Combined_Remaining_perc',
+    'cvap_White_Combined_perc',
+    'cvap_Asian_Combined_perc',
+    'cvap_Hispanic_or_Latino_Combined_perc',
+    'cvap_Black_or_African_American_Combined_perc',
+    'cvap_American_Indian_or_Alaska_Native_Combined_perc',
+    'cvap_Native_Hawaiian_or_Other_Pacific_Islander_Combined_perc',
+]
+
+INCOME_LABELS = [
+    '<$10,000',
+    '$15,000',
+    '$20,000',
+    '$25,000',
+    '$30,000',
+    '$35,000',
+    '$40,000',
+    '$45,000',
+    '$50,000',
+    '$60,000 ',
+    '$75,000',
+    '$100,000',
+    '$125,000',
+    '$150,000',
+    '$200,000 ',
+    '>$200,000'
+]
+
+def annotate_bars(ax: plt.Axes, bars: List, size: int) -> List:
+    """
+    Add an empty label above each bar, to be filled in by update_bar_labels.
+    """
+
+    return [ax.annotate('', (bar.get_x() + bar.get_width() / 2, 0), ha='center', va='center',
+                        size=size, xytext=(0, 8), textcoords='offset points')
+            for bar in bars]
+
+def update_bars(bars: List, heights: List[float]) -> None:
+    """
+    Set the bar heights.
+    """
+
+    for bar, height in zip(bars, heights):
+        bar.set_height(height)
+
+def update_bar_labels(labels: List, bars: List, values: List[float]) -> None:
+    """
+    Move each label to the top of its bar and show the value as a percentage.
+    """
+
+    for label, bar, value in zip(labels, bars, values):
+        label.xy = (bar.get_x() + bar.get_width() / 2, bar.get_height())
+        label.set_text(format(value, '.2f') + "%")
+
+class DistrictMap:
+    """
+    Block group polygons drawn once as a fill and an outline collection, recolored per partition.
+    """
+
+    def __init__(self, ax: plt.Axes, geodataframe: gpd.GeoDataFrame, basemap: Optional[bm.Basemap] = None) -> None:
+
+        # multipolygons are drawn as one patch per part, so keep the block group of every patch
+        patch_gdf = geodataframe.explode(index_parts=False)
+        self.patch_geoids = patch_gdf['GEOID'].tolist()
+
+        ax.axes.xaxis.set_visible(False)
+        ax.axes.yaxis.set_visible(False)
+
+        self.fill = patch_gdf.plot(ax=ax, color=DISTRICT_COLORS[0], alpha=0.15).collections[-1]
+        self.outline = patch_gdf.plot(ax=ax, edgecolor=DISTRICT_COLORS[0], linewidth=2, facecolor='none').collections[-1]
+        bm.add_basemap(ax, geodataframe, basemap)
+
+    def update(self, assignment: Dict) -> None:
+        """
+        Color each block group by its district, large district 1 and small district 2.
+        """
+
+        district_colors = np.array([to_rgba(color) for color in DISTRICT_COLORS])
+        patch_colors = district_colors[[assignment[geoid] - 1 for geoid in self.patch_geoids]]
+
+        self.fill.set_facecolor(patch_colors)
+        self.fill.set_edgecolor(patch_colors)
+        self.fill.set_alpha(0.15)
+        self.outline.set_edgecolor(patch_colors)
+
+class PartitionMapTemplate:
+    """
+    Figure of plot.plot_partition, built once and redrawn per partition.
+    """
+
+    def __init__(self, geodataframe: gpd.GeoDataFrame, basemap: Optional[bm.Basemap] = None) -> None:
+
+        self.dpi = 200
+        fig_hw = (12, 10)
+
+        self.fig, ax = plt.subplots()
+        self.fig.set_size_inches(fig_hw)
+
+        self.district_map = DistrictMap(ax, geodataframe, basemap)
+
+    def render(self, partition_info: Dict, save_path: str) -> None:
+        """
+        Draw the partition and save the figure.
+        """
+
+        self.district_map.update(partition_info['assignment'])
+        self.fig.savefig(save_path, dpi=self.dpi, format='png', transparent=False)
+
+    def close(self) -> None:
+        plt.close(self.fig)
+
+class PartitionStatsTemplate:
+    """
+    Figure of plot.plot_partition_stats, built once and redrawn per partition.
+    """
+
+    def __init__(self,
+                 geodataframe: gpd.GeoDataFrame,
+                 n_district_electeds: List[int],
+                 basemap: Optional[bm.Basemap] = None) -> None:
+
+        self.dpi = 200
+        fig_hw = (12, 10)
+
+        # set up axes
+        self.fig = plt.figure()
+        self.fig.set_size_inches(fig_hw)
+
+        gs = self.fig.add_gridspec(11, 9)
+
+        map_ax = self.fig.add_subplot(gs[:3, 3:6])
+        self.total_pop_ax = self.fig.add_subplot(gs[:3, 0:3])
+        renters_ax = self.fig.add_subplot(gs[:3, 6:])
+
+        self.income_pdf_ax = self.fig.add_subplot(gs[4:7, 6:])
+        income_invcdf_ax = self.fig.add_subplot(gs[8:, 6:])
+
+        ld_eth_alone_ax = self.fig.add_subplot(gs[4:7, 0:3])
+        sd_eth_alone_ax = self.fig.add_subplot(gs[8:, 0:3])
+
+        ld_eth_combined_ax = self.fig.add_subplot(gs[4:7, 3:6])
+        sd_eth_combined_ax = self.fig.add_subplot(gs[8:, 3:6])
+
+        # map
+        self.district_map = DistrictMap(map_ax, geodataframe, basemap)
+        map_ax.set_title(f'district sizes {sorted(n_district_electeds)}', fontsize=10)
+
+        # total pop
+        total_pop_labels = ['total', 'Large\nDistrict', 'Small\nDistrict']
+        self.total_pop_bars = self.total_pop_ax.bar(range(3), [0] * 3, width=0.5, color=['k'] + DISTRICT_COLORS, alpha=0.5)
+        self.total_pop_labels = annotate_bars(self.total_pop_ax, self.total_pop_bars[1:], size=10)
+
+        self.total_pop_ax.set_title('District CVAP Total Pop.', fontsize=10)
+        self.total_pop_ax.set_xticks(range(3))
+        self.total_pop_ax.set_xticklabels(total_pop_labels, rotation=0)
+
+        # district demographics
+        self.eth_bars = {}
+        self.eth_labels = {}
+        eth_axes = {
+            ('LD', 'alone'): (ld_eth_alone_ax, 'Large District CVAP Ethnicity (Alone)'),
+            ('SD', 'alone'): (sd_eth_alone_ax, 'Small District CVAP Ethnicity (Alone)'),
+            ('LD', 'combined'): (ld_eth_combined_ax, 'Large District CVAP Ethnicity (Combined)'),
+            ('SD', 'combined'): (sd_eth_combined_ax, 'Small District CVAP Ethnicity (Combined)'),
+        }
+
+        for (district, category), (ax, title) in eth_axes.items():
+            color = DISTRICT_COLORS[0] if district == 'LD' else DISTRICT_COLORS[1]
+            bars = ax.bar(range(len(ETHNICITY_LABELS)), [0] * len(ETHNICITY_LABELS), width=0.5, color=color, alpha=0.5)
+
+            self.eth_bars[district, category] = bars
+            self.eth_labels[district, category] = annotate_bars(ax, bars, size=8)
+
+            ax.set_title(title, fontsize=10)
+            ax.set_ylim(bottom=0, top=100)
+            ax.set_xticks(range(len(ETHNICITY_LABELS)))
+
+            if district == 'LD':
+                ax.set_xticklabels([])
+                ax.tick_params(axis='x', which='major', labelsize=8)
+            else:
+                ax.set_xticklabels(ETHNICITY_LABELS, rotation=60)
+                ax.tick_params(axis='x', which='major', labelsize=7)
+
+            if category == 'alone':
+                ax.set_ylabel('percent')
+            else:
+                ax.set_yticks([])
+                ax.set_yticks([], minor=True)
+
+        # renter breakdown
+        self.renter_bars = renters_ax.bar(range(2), [0] * 2, width=0.5, color=DISTRICT_COLORS, alpha=0.5)
+        self.renter_labels = annotate_bars(renters_ax, self.renter_bars, size=8)
+
+        renters_ax.set_title('District Renters', fontsize=10)
+        renters_ax.set_xticks(range(2))
+        renters_ax.set_xticklabels(['Large\nDistrict', 'Small\nDistrict'], rotation=0)
+        renters_ax.tick_params(axis='x', which='major', labelsize=10)
+        renters_ax.tick_params(axis='y', which='major', labelsize=10)
+        renters_ax.yaxis.set_label_position("right")
+        renters_ax.yaxis.tick_right()
+        renters_ax.set_ylabel('percent')
+        renters_ax.set_ylim([0, 100])
+
+        # income distributions
+        income_x = np.arange(len(INCOME_LABELS))
+
+        self.income_pdf_bars = [self.income_pdf_ax.bar(income_x, [0] * len(INCOME_LABELS), width=0.5, color=color, alpha=0.5)
+                                for color in DISTRICT_COLORS]
+
+        self.income_pdf_ax.set_title('District Income Distribution', fontsize=10)
+        self.income_pdf_ax.yaxis.tick_right()
+        self.income_pdf_ax.set_ylabel('count')
+        self.income_pdf_ax.yaxis.set_label_position("right")
+        self.income_pdf_ax.set_xticks(income_x)
+        self.income_pdf_ax.set_xticklabels([])
+
+        self.income_cdf_lines = [income_invcdf_ax.plot(income_x, np.zeros(len(INCOME_LABELS)), color=color)[0]
+                                 for color in DISTRICT_COLORS]
+
+        extraticks = []
+        for idx, n in enumerate(sorted(n_district_electeds, reverse=True)):
+            quota = 100/(n+1)
+            extraticks.append(quota)
+            income_invcdf_ax.axhline(y=quota, ls='--', color=DISTRICT_COLORS[idx], alpha=0.3)
+
+        income_invcdf_ax.set_title('District Income Cumulative Dist', fontsize=10)
+        income_invcdf_ax.yaxis.tick_right()
+        income_invcdf_ax.set_ylabel('percent')
+        income_invcdf_ax.yaxis.set_label_position("right")
+        income_invcdf_ax.set_ylim([0, 100])
+        income_invcdf_ax.set_yticks(list(np.linspace(0, 100, 6)) + extraticks)
+        income_invcdf_ax.set_xlabel('income range')
+        income_invcdf_ax.set_xticks(income_x)
+        income_invcdf_ax.set_xticklabels(INCOME_LABELS, rotation=60)
+        income_invcdf_ax.tick_params(axis='x', which='major', labelsize=7)
+
+    def render(self, partition_info: Dict, partition_stats: pd.DataFrame, save_path: str) -> None:
+        """
+        Update the figure with the partition's districts and stats and save it.
+        """
+
+        stats = partition_stats.iloc[0]
+
+        self.district_map.update(partition_info['assignment'])
+
+        # total pop
+        total_pops = [stats['jurisdiction_cvap_total_count'], stats['LD_cvap_total_count'], stats['SD_cvap_total_count']]
+        update_bars(self.total_pop_bars, total_pops)
+        update_bar_labels(self.total_pop_labels, self.total_pop_bars[1:], [100 * pop / total_pops[0] for pop in total_pops[1:]])
+        self.total_pop_ax.set_ylim(0, 1.05 * max(total_pops))
+
+        # district demographics
+        for (district, category), bars in self.eth_bars.items():
+            columns = ETHNICITY_ALONE_COLUMNS if category == 'alone' else ETHNICITY_COMBINED_COLUMNS
+            percs = [stats[f'{district}_{col}'] for col in columns]
+            update_bars(bars, percs)
+            update_bar_labels(self.eth_labels[district, category], bars, percs)
+
+        # renters
+        renter_percs = [stats['LD_housing_rent_perc'], stats['SD_housing_rent_perc']]
+        update_bars(self.renter_bars, renter_percs)
+        update_bar_labels(self.renter_labels, self.renter_bars, renter_percs)
+
+        # income
+        income_updaters = {k: v for k, v in partition_info['updaters'].items() if 'income' in k}
+
+        for district_id, bars, line in zip([1, 2], self.income_pdf_bars, self.income_cdf_lines):
+            counts = np.array([v[district_id] for _, v in sorted(income_updaters.items())], dtype=float)
+            update_bars(bars, counts)
+            line.set_ydata(100 * counts.cumsum() / counts.sum())
+
+        max_count = max(bar.get_height() for bars in self.income_pdf_bars for bar in bars)
+        self.income_pdf_ax.set_ylim(0, 1.05 * max_count)
+
+        self.fig.savefig(save_path, dpi=self.dpi, format='png', transparent=False)
+
+    def close(self) -> None:
+        plt.close(self.fig)
@@ -0,0 +1,48 @@
+# %%
+import argparse
+import pathlib
+import os
+import time
+
+import pandas as pd
+
+import plan_store
+
+# paths
+file_path = pathlib.Path(os.path.realpath(__file__))
+dir_path = file_path.parent
+
+district_maps_dir = dir_path / '../../data/albany/district_maps'
+
+#######################################################
+# filter the plans of a run, e.g.
+# python query_plans.py recom_3_2 "SD_cvap_Asian_Alone_perc > 30" "SD_quadrant == NE" "SD contains 060014201001"
+
+parser = argparse.ArgumentParser(description='Filter the plans of a run_recom output directory.')
+parser.add_argument('run', help='run directory name under data/albany/district_maps, or a path')
+parser.add_argument('predicates', nargs='*', help="e.g. 'LD_housing_rent_perc < 50', 'SD_quadrant == NE', 'SD contains <GEOID>'")
+parser.add_argument('--columns', nargs='*', default=['map_id'], help='stats columns to print, all if empty')
+parser.add_argument('--geoids', action='store_true', help='also print LD_geoids and SD_geoids')
+parser.add_argument('--output', help='write the matching rows to this csv instead of printing them')
+args = parser.parse_args()
+
+run_dir = pathlib.Path(args.run) if os.path.isdir(args.run) else district_maps_dir / args.run
+store = plan_store.open_run(run_dir)
+
+start = time.perf_counter()
+rows = store.query(args.predicates)
+elapsed = time.perf_counter() - start
+
+stats_df = store.stats(rows, geoids=args.geoids)
+if args.columns:
+    stats_df = stats_df.loc[:, args.columns + (['LD_geoids', 'SD_geoids'] if args.geoids else [])]
+
+if args.output:
+    stats_df.to_csv(args.output, index=False)
+else:
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', None):
+        print(stats_df.to_string(index=False))
+
+print(f'{len(rows)} of {len(store)} plans match ({elapsed * 1000:.1f} ms)')
+
+# %%
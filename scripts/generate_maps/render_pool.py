@@ -0,0 +1,117 @@
+"""
+Render the map PNGs of many partitions in a process pool, separate from the chain and the stats.
+"""
+from typing import (Dict, List, Optional, Tuple)
+
+import concurrent.futures
+import pathlib
+import traceback
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+import bundle
+import basemap as bm
+import plot
+import plot_templates
+import stats
+
+# per worker state, set up once by init_worker
+_worker = {}
+
+def partition_info_from_assignment(assignment: np.ndarray,
+                                   geodataframe: gpd.GeoDataFrame,
+                                   n_district_electeds: List[int]) -> Dict:
+    """
+    Rebuild the reorganize_partition_info fields the plots use from an assignment in geodataframe row order.
+    """
+
+    income_totals = {district_id: geodataframe.loc[assignment == district_id, stats.income_columns(geodataframe)].sum()
+                     for district_id in (1, 2)}
+
+    return {
+        'assignment': dict(zip(geodataframe['GEOID'], assignment.tolist())),
+        'updaters': {col: {district_id: income_totals[district_id][col] for district_id in (1, 2)}
+                     for col in stats.income_columns(geodataframe)},
+        'n_district_electeds': n_district_electeds
+    }
+
+def init_worker(shapefile_path: str, basemap_path: str, n_district_electeds: List[int], render_mode: str) -> None:
+    """
+    Load the geometry and basemap once per worker and build the figure templates.
+    """
+
+    gdf = bundle.load_bundle(shapefile_path).geodataframe()
+    basemap = bm.Basemap(basemap_path, gdf.crs.to_string())
+
+    _worker.update({
+        'gdf': gdf,
+        'basemap': basemap,
+        'n_district_electeds': n_district_electeds,
+        'render_mode': render_mode,
+    })
+
+    if render_mode == 'template':
+        _worker['map_template'] = plot_templates.PartitionMapTemplate(gdf, basemap=basemap)
+        _worker['stats_template'] = plot_templates.PartitionStatsTemplate(gdf, n_district_electeds, basemap=basemap)
+
+def render_partition(map_id: int, assignment: np.ndarray, stats_row: Dict, map_output_dir: pathlib.Path) -> Tuple[int, Optional[str]]:
+    """
+    Render both PNGs of one partition. Returns the map id and the traceback if rendering failed.
+    """
+
+    try:
+        gdf = _worker['gdf']
+        partition_info = partition_info_from_assignment(assignment, gdf, _worker['n_district_electeds'])
+        partition_stats = pd.DataFrame([stats_row])
+
+        map_path = map_output_dir / f'{map_id}_map.png'
+        map_stats_path = map_output_dir / f'{map_id}_map_stats.png'
+
+        if _worker['render_mode'] == 'template':
+            _worker['map_template'].render(partition_info, map_path)
+            _worker['stats_template'].render(partition_info, partition_stats, map_stats_path)
+        else:
+            plot.plot_partition(partition_info, gdf, map_path, basemap=_worker['basemap'])
+            plot.plot_partition_stats(partition_info, partition_stats, gdf, map_stats_path, basemap=_worker['basemap'])
+
+    except Exception:
+        return map_id, traceback.format_exc()
+
+    return map_id, None
+
+def render_partitions(assignments: np.ndarray,
+                      stats_df: pd.DataFrame,
+                      map_output_dir: pathlib.Path,
+                      shapefile_path: str,
+                      basemap_path: str,
+                      n_district_electeds: List[int],
+                      render_mode: str = 'template',
+                      n_workers: Optional[int] = None) -> Dict[int, str]:
+    """
+    Render the map and map stats PNGs of every partition in a process pool.
+
+    assignments - (n_plans x n_nodes) int8 array of district ids in bundle row order
+    stats_df - stats table with one row per plan, in the same order
+    Returns the traceback of every map that failed, by map id. Other maps are still rendered.
+    """
+
+    failures = {}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers,
+                                                initializer=init_worker,
+                                                initargs=(shapefile_path, basemap_path, n_district_electeds, render_mode)) as executor:
+
+        futures = [executor.submit(render_partition, stats_row['map_id'], assignment, stats_row, map_output_dir)
+                   for assignment, stats_row in zip(assignments, stats_df.to_dict('records'))]
+
+        for future in concurrent.futures.as_completed(futures):
+            map_id, error = future.result()
+            if error is not None:
+                failures[map_id] = error
+
+    return failures
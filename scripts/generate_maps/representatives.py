@@ -0,0 +1,135 @@
+"""
+Pick a few representative plans out of a large ensemble by clustering plans on the block groups they move.
+"""
+from typing import (Optional, Tuple)
+
+import numpy as np
+import pandas as pd
+
+import web_output
+
+# number of set bits of every byte value
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+def weighted_popcount_tables(node_weights: np.ndarray, n_bytes: int) -> np.ndarray:
+    """
+    Return an (n_bytes x 256) table, entry [b, v] the summed weight of the nodes whose bits are set in v at byte b.
+
+    node_weights - weight of each node in packed bit order, e.g. its cvap_total
+    """
+
+    weights = np.zeros(n_bytes * 8)
+    weights[:len(node_weights)] = node_weights
+    bits = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little')
+
+    return weights.reshape(n_bytes, 8) @ bits.T
+
+def pairwise_distances(packed: np.ndarray,
+                       node_weights: Optional[np.ndarray] = None,
+                       chunk_size: int = 256) -> np.ndarray:
+    """
+    Return the (n_plans x n_plans) distances between bit packed plans.
+
+    packed - output of web_output.pack_assignments, one row per plan, a bit set per small district node
+    node_weights - None for the Hamming distance, the number of block groups in one plan's small district
+                   but not the other's, or a weight per node for the weight of those block groups
+    Rows are XORed a byte at a time against all plans and the set bits counted by table lookup, chunk_size
+    rows at a time to bound memory.
+    """
+
+    n_plans, n_bytes = packed.shape
+
+    if node_weights is None:
+        tables = np.broadcast_to(POPCOUNT, (n_bytes, 256))
+        distances = np.empty((n_plans, n_plans), dtype=np.int32)
+    else:
+        tables = weighted_popcount_tables(np.asarray(node_weights, dtype=float), n_bytes)
+        distances = np.empty((n_plans, n_plans), dtype=np.float64)
+
+    byte_idx = np.arange(n_bytes)
+
+    for start in range(0, n_plans, chunk_size):
+        diff = packed[start:start + chunk_size, None, :] ^ packed[None, :, :]
+        distances[start:start + chunk_size] = tables[byte_idx, diff].sum(axis=2)
+
+    return distances
+
+def k_medoids(distances: np.ndarray, n_clusters: int, seed: int = 0, max_iter: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster plans around n_clusters medoid plans with the alternating k-medoids algorithm.
+
+    Medoids are seeded k-means++ style, plans far from the medoids so far being more likely picks.
+    Returns the medoid plan indices, fewer than n_clusters if medoids end up without plans, and the cluster
+    of every plan.
+    """
+
+    n_plans = distances.shape[0]
+    if n_clusters >= n_plans:
+        return np.arange(n_plans), np.arange(n_plans)
+
+    rng = np.random.default_rng(seed)
+
+    # the most central plan first
+    medoids = [int(distances.sum(axis=1).argmin())]
+    nearest = distances[medoids[0]].astype(float)
+
+    while len(medoids) < n_clusters:
+        weights = nearest ** 2
+        if weights.sum() == 0:
+            break
+        medoid = int(rng.choice(n_plans, p=weights / weights.sum()))
+        medoids.append(medoid)
+        nearest = np.minimum(nearest, distances[medoid])
+
+    medoids = np.array(medoids)
+
+    for _ in range(max_iter):
+        labels = distances[:, medoids].argmin(axis=1)
+
+        new_medoids = medoids.copy()
+        for cluster in range(len(medoids)):
+            members = np.flatnonzero(labels == cluster)
+            # a medoid identical to an earlier one gets no plans, keep it until the end
+            if len(members) == 0:
+                continue
+            new_medoids[cluster] = members[distances[np.ix_(members, members)].sum(axis=1).argmin()]
+
+        if np.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+
+    # drop medoids left without plans
+    labels = distances[:, medoids].argmin(axis=1)
+    medoids = medoids[np.bincount(labels, minlength=len(medoids)) > 0]
+
+    return medoids, distances[:, medoids].argmin(axis=1)
+
+def select_representatives(assignments: np.ndarray,
+                           map_ids: np.ndarray,
+                           n_representatives: int,
+                           node_weights: Optional[np.ndarray] = None,
+                           seed: int = 0) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Cluster the plans and return one row per cluster plus the cluster of every plan.
+
+    assignments - (n_plans x n_nodes) array of district ids, rows matching map_ids
+    node_weights - weight of each node for a population weighted distance, see pairwise_distances
+    The representatives table has the cluster, the map_id of its medoid plan, cluster_size and the
+    mean_distance of its plans to the medoid, largest clusters first.
+    """
+
+    distances = pairwise_distances(web_output.pack_assignments(assignments), node_weights)
+    medoids, labels = k_medoids(distances, n_representatives, seed=seed)
+
+    cluster_sizes = np.bincount(labels, minlength=len(medoids))
+    mean_distances = np.bincount(labels, weights=distances[np.arange(len(labels)), medoids[labels]], minlength=len(medoids)) / cluster_sizes
+
+    representatives_df = pd.DataFrame({
+        'cluster': np.arange(len(medoids)),
+        'map_id': np.asarray(map_ids)[medoids],
+        'cluster_size': cluster_sizes,
+        'mean_distance': mean_distances
+    })
+    representatives_df = representatives_df.sort_values('cluster_size', ascending=False, kind='stable').reset_index(drop=True)
+
+    return representatives_df, labels
@@ -0,0 +1,73 @@
+"""
+Draw a two district seed plan whose small district is directly inside the size bounds, without rejection
+sampling equal splits.
+"""
+from typing import (Dict, Tuple)
+
+import random
+import time
+
+import numpy as np
+import networkx as nx
+
+import fast_recom
+
+def seed_unequal_partition(graph: nx.Graph,
+                           pop_col: str,
+                           lower_bound_prop: float,
+                           upper_bound_prop: float,
+                           max_attempts: int = 1_000) -> Tuple[Dict, Dict]:
+    """
+    Return an assignment to districts 1 and 2 whose smaller district holds between lower_bound_prop and
+    upper_bound_prop of the population, and a report of how it was found.
+
+    Each attempt draws a small district target inside the bounds and a uniform spanning tree, and cuts the
+    tree edge whose smaller side is closest to the target among those inside the bounds. Both sides of a
+    tree cut are connected. Raises RuntimeError after max_attempts trees without such an edge.
+    The report has the target and achieved small district proportions, attempts and elapsed seconds.
+    """
+
+    start = time.perf_counter()
+
+    csr = fast_recom.CSRGraph(graph, pop_col)
+    total_pop = csr.pops.sum()
+    in_region = np.ones(len(csr), dtype=bool)
+
+    for attempt in range(1, max_attempts + 1):
+
+        target_prop = random.uniform(lower_bound_prop, upper_bound_prop)
+
+        parent, depth, root = csr.wilson_tree(in_region)
+        subtree, levels = csr.subtree_pops(in_region, parent, depth)
+
+        # population of the smaller side of the cut above every node
+        small_prop = np.minimum(subtree, total_pop - subtree) / total_pop
+        valid = (small_prop >= lower_bound_prop) & (small_prop <= upper_bound_prop)
+        valid[root] = False
+
+        cuts = np.flatnonzero(valid)
+        if len(cuts) == 0:
+            continue
+
+        distance = np.abs(small_prop[cuts] - target_prop)
+        closest = cuts[distance == distance.min()]
+        cut = closest[int(random.random() * len(closest))]
+
+        in_subtree = np.zeros(len(csr), dtype=bool)
+        in_subtree[cut] = True
+        for level in levels[depth[cut] + 1:]:
+            in_subtree[level] |= in_subtree[parent[level]]
+
+        assignment = {node: 1 if in_subtree[idx] else 2 for idx, node in enumerate(csr.nodes)}
+
+        report = {
+            'target_prop': target_prop,
+            'small_district_prop': float(small_prop[cut]),
+            'attempts': attempt,
+            'elapsed': time.perf_counter() - start,
+        }
+
+        return assignment, report
+
+    raise RuntimeError(f'Could not find a seed plan with the small district between {lower_bound_prop} and '
+                       f'{upper_bound_prop} after {max_attempts} attempts ({time.perf_counter() - start:.1f}s).')
@@ -0,0 +1,23 @@
+# %%
+import pathlib
+import os
+
+import lazy_render
+
+# paths
+file_path = pathlib.Path(os.path.realpath(__file__))
+dir_path = file_path.parent
+
+district_maps_dir = dir_path / '../../data/albany/district_maps'
+albany_bg_shapefile_path = dir_path / '../../data/albany/2019_bg/bg.shp'
+basemap_path = dir_path / '../../data/albany/basemap.tif'
+image_cache_dir = dir_path / '../../data/cache/map_images'
+
+#######################################################
+# render maps of any run on request
+
+image_cache = lazy_render.ImageCache(image_cache_dir, albany_bg_shapefile_path, basemap_path)
+
+lazy_render.serve(district_maps_dir, image_cache, port=8000)
+
+# %%
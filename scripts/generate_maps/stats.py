@@ -0,0 +1,203 @@
+"""
+Functions for calculating the map_stats.csv columns for a whole ensemble of two district plans at once.
+"""
+from typing import (Dict, List, Optional, Sequence, Tuple)
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+# stats column name and the cvap columns summed for it
+CVAP_ALONE_GROUPS = [
+    ('cvap_White_Alone', ['cvap_W']),
+    ('cvap_Black_or_African_American_Alone', ['cvap_AA']),
+    ('cvap_Asian_Alone', ['cvap_A']),
+    ('cvap_Hispanic_or_Latino_Alone', ['cvap_L']),
+    ('cvap_American_Indian_or_Alaska_Native_Alone', ['cvap_NA']),
+    ('cvap_Native_Hawaiian_or_Other_Pacific_Islander_Alone', ['cvap_NH']),
+    ('cvap_Alone_Remaining', ['cvap_NA+AA', 'cvap_NA+W', 'cvap_A+W', 'cvap_AA+W', 'cvap_rest']),
+]
+
+CVAP_COMBINED_GROUPS = [
+    ('cvap_White_Combined', ['cvap_W']),
+    ('cvap_Black_or_African_American_Combined', ['cvap_AA', 'cvap_AA+W']),
+    ('cvap_Asian_Combined', ['cvap_A', 'cvap_A+W']),
+    ('cvap_Hispanic_or_Latino_Combined', ['cvap_L']),
+    ('cvap_American_Indian_or_Alaska_Native_Combined', ['cvap_NA', 'cvap_NA+W']),
+    ('cvap_Native_Hawaiian_or_Other_Pacific_Islander_Combined', ['cvap_NH']),
+    ('cvap_Combined_Remaining', ['cvap_NA+AA', 'cvap_rest']),
+]
+
+DISTRICTS = [('LD', 1), ('SD', 2)]
+
+def cvap_category_columns(geodataframe: gpd.GeoDataFrame) -> List[str]:
+    """
+    Return the cvap columns that add up to the district total, leaving out cvap_total and cvap_not_L.
+    """
+
+    return [col for col in geodataframe.columns if 'cvap' in col and 'total' not in col and col != 'cvap_not_L']
+
+def income_columns(geodataframe: gpd.GeoDataFrame) -> List[str]:
+    """
+    Return the income bucket columns in bucket order.
+    """
+
+    return sorted(col for col in geodataframe.columns if 'income' in col and 'tot' not in col)
+
+def assignment_matrix(partition_infos: List[Dict], geoids: Sequence[str]) -> np.ndarray:
+    """
+    Stack the reorganized assignments of the plans into an (n_plans x n_nodes) array in geoids order.
+    """
+
+    return np.array([[partition_info['assignment'][geoid] for geoid in geoids] for partition_info in partition_infos],
+                    dtype=np.int8).reshape(len(partition_infos), len(geoids))
+
+def area_moments(geodataframe: gpd.GeoDataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the area and the area weighted centroid x and y of each block group.
+
+    The centroid of a union of non-overlapping polygons is the area weighted mean of their centroids, so
+    summing these over a district's block groups gives the same centroid as dissolving them. Uses the exact
+    bg_area, bg_centroid_x and bg_centroid_y columns when the geodataframe comes from a bundle.
+    """
+
+    if {'bg_area', 'bg_centroid_x', 'bg_centroid_y'} <= set(geodataframe.columns):
+        area = geodataframe['bg_area'].to_numpy(dtype=float)
+        return area, area * geodataframe['bg_centroid_x'].to_numpy(dtype=float), area * geodataframe['bg_centroid_y'].to_numpy(dtype=float)
+
+    area = geodataframe.geometry.area.to_numpy()
+    centroid = geodataframe.geometry.centroid
+
+    return area, area * centroid.x.to_numpy(), area * centroid.y.to_numpy()
+
+def calc_sd_quadrants(assignments: np.ndarray, geodataframe: gpd.GeoDataFrame) -> List[Optional[str]]:
+    """
+    Return which quadrant of the jurisdiction the small district centroid is in, for each plan.
+
+    assignments - (n_plans x n_nodes) array of district ids in geodataframe row order
+    """
+
+    area, moment_x, moment_y = area_moments(geodataframe)
+
+    # get small district centroids
+    in_SD = (assignments == 2).astype(float)
+    SD_area = in_SD @ area
+    SD_x = (in_SD @ moment_x) / SD_area
+    SD_y = (in_SD @ moment_y) / SD_area
+
+    # get centroid for all of albany
+    whole_albany_x = moment_x.sum() / area.sum()
+    whole_albany_y = moment_y.sum() / area.sum()
+
+    conditions = [
+        (SD_x < whole_albany_x) & (SD_y > whole_albany_y),
+        (SD_x < whole_albany_x) & (SD_y < whole_albany_y),
+        (SD_x > whole_albany_x) & (SD_y > whole_albany_y),
+        (SD_x > whole_albany_x) & (SD_y < whole_albany_y),
+    ]
+
+    quadrants = np.select(conditions, ['NW', 'SW', 'NE', 'SE'], default='')
+
+    return [quadrant or None for quadrant in quadrants]
+
+def calc_sd_quadrant(assignment: Dict, geodataframe: gpd.GeoDataFrame) -> Optional[str]:
+    """
+    Return which quadrant of the jurisdiction the small district centroid is in.
+    """
+
+    assignments = np.array([[assignment[geoid] for geoid in geodataframe['GEOID']]])
+
+    return calc_sd_quadrants(assignments, geodataframe)[0]
+
+def income_range_at_quota(income_totals: np.ndarray, quota: float, income_cols: List[str]) -> List[Optional[str]]:
+    """
+    Return the first income bucket where the cumulative share of households goes over the quota, for each plan.
+    """
+
+    cumulative_share = np.cumsum(income_totals, axis=1) / income_totals.sum(axis=1, keepdims=True)
+    over_quota = cumulative_share > quota
+
+    bucket_idx = over_quota.argmax(axis=1)
+
+    return [income_cols[idx] if reached else None for idx, reached in zip(bucket_idx, over_quota.any(axis=1))]
+
+def calc_ensemble_stats(assignments: np.ndarray,
+                        geodataframe: gpd.GeoDataFrame,
+                        n_district_electeds: List[int],
+                        map_ids: Optional[Sequence[int]] = None) -> pd.DataFrame:
+    """
+    Calculate the calc_partition_stats columns for every plan with one matrix multiply per district.
+
+    assignments - (n_plans x n_nodes) array of district ids in geodataframe row order, 1 for the large
+                  district and 2 for the small district
+    geodataframe - block groups with the cvap, house and income columns
+    n_district_electeds - number of seats in each district
+    map_ids - id of each plan, defaults to the row number
+    """
+
+    n_plans = assignments.shape[0]
+    if map_ids is None:
+        map_ids = np.arange(n_plans)
+
+    cvap_cols = cvap_category_columns(geodataframe)
+    inc_cols = income_columns(geodataframe)
+    house_cols = ['house_own', 'house_rent']
+
+    attribute_cols = list(dict.fromkeys(cvap_cols + inc_cols + house_cols))
+    col_idx = {col: idx for idx, col in enumerate(attribute_cols)}
+    attributes = geodataframe[attribute_cols].to_numpy(dtype=float)
+
+    # district totals, (n_plans x n_attributes) per district
+    totals = {name: (assignments == district_id).astype(float) @ attributes for name, district_id in DISTRICTS}
+
+    def total(name, cols):
+        return totals[name][:, [col_idx[col] for col in cols]].sum(axis=1)
+
+    stats = {'map_id': np.asarray(map_ids)}
+
+    # cvap info
+    cvap_total = {name: total(name, cvap_cols) for name, _ in DISTRICTS}
+    jurisdiction_cvap_total = cvap_total['LD'] + cvap_total['SD']
+
+    stats['jurisdiction_cvap_total_count'] = jurisdiction_cvap_total
+
+    for name, _ in DISTRICTS:
+        stats[f'{name}_cvap_total_count'] = cvap_total[name]
+
+    for name, _ in DISTRICTS:
+        stats[f'{name}_cvap_total_perc'] = 100 * cvap_total[name] / jurisdiction_cvap_total
+
+    for groups in (CVAP_ALONE_GROUPS, CVAP_COMBINED_GROUPS):
+        for name, _ in DISTRICTS:
+            for group_name, group_cols in groups:
+                stats[f'{name}_{group_name}_perc'] = 100 * total(name, group_cols) / cvap_total[name]
+
+    # rent and ownership
+    for name, _ in DISTRICTS:
+        house_total = total(name, house_cols)
+        stats[f'{name}_housing_own_perc'] = 100 * total(name, ['house_own']) / house_total
+        stats[f'{name}_housing_rent_perc'] = 100 * total(name, ['house_rent']) / house_total
+
+    # income percentile
+    quotas = {
+        'LD': 1 / (sorted(n_district_electeds)[1] + 1),
+        'SD': 1 / (sorted(n_district_electeds)[0] + 1)
+    }
+
+    for name, _ in DISTRICTS:
+        income_totals = totals[name][:, [col_idx[col] for col in inc_cols]]
+        stats[f'{name}_income_range_at_quota'] = income_range_at_quota(income_totals, quotas[name], inc_cols)
+
+    # add quadrant
+    stats['SD_quadrant'] = calc_sd_quadrants(assignments, geodataframe)
+
+    # add geoid
+    geoids = geodataframe['GEOID'].tolist()
+    geoid_order = np.argsort(geoids)
+    sorted_geoids = np.array(geoids, dtype=object)[geoid_order]
+    sorted_assignments = assignments[:, geoid_order]
+
+    for name, district_id in DISTRICTS:
+        stats[f'{name}_geoids'] = [";".join(sorted_geoids[row == district_id]) for row in sorted_assignments]
+
+    return pd.DataFrame(stats)
@@ -0,0 +1,131 @@
+"""
+One gerrychain updater tallying many node attributes per district at once with NumPy.
+"""
+from typing import (Dict, Iterable, List)
+
+import numpy as np
+
+import gerrychain as gc
+
+class DistrictTotals:
+    """
+    Attribute totals of every district, rows in districts order and columns in columns order.
+    """
+
+    def __init__(self, districts: List, columns: List[str], totals: np.ndarray) -> None:
+
+        self.districts = districts
+        self.columns = columns
+        self.totals = totals
+
+        self.district_index = {district: idx for idx, district in enumerate(districts)}
+        self.column_index = {col: idx for idx, col in enumerate(columns)}
+
+    def __getitem__(self, col: str) -> Dict:
+        """
+        Return the totals of one column by district, like gc.updaters.Tally.
+        """
+
+        col_idx = self.column_index[col]
+        return {district: self.totals[idx, col_idx].item() for idx, district in enumerate(self.districts)}
+
+class MultiTally:
+    """
+    Updater holding the totals of columns for every district as one (n_districts x n_columns) array.
+
+    The node attributes are read into a (n_nodes x n_columns) matrix once per graph. After the first
+    partition, each step adds the rows of the flipped nodes to their new districts and subtracts them
+    from their old ones, so the cost per step does not depend on the number of columns.
+    """
+
+    def __init__(self, columns: Iterable[str], alias: str = 'attribute_totals') -> None:
+
+        self.columns = list(columns)
+        self.alias = alias
+
+        self._graph = None
+        self._node_index = None
+        self._matrix = None
+
+    def matrix(self, graph: gc.Graph) -> np.ndarray:
+        """
+        Return the node attribute matrix of the graph, reading it the first time.
+        """
+
+        # partitions wrap the graph in a FrozenGraph, key on the graph underneath
+        graph = getattr(graph, 'graph', graph)
+
+        if self._graph is not graph:
+            nodes = list(graph.nodes)
+            self._node_index = {node: idx for idx, node in enumerate(nodes)}
+            self._matrix = np.array([[graph.nodes[node][col] for col in self.columns] for node in nodes],
+                                    dtype=float).reshape(len(nodes), len(self.columns))
+            self._graph = graph
+
+        return self._matrix
+
+    def totals(self, partition: gc.Partition) -> DistrictTotals:
+        """
+        Sum the columns of every district from the partition's full assignment, ignoring its parent.
+        """
+
+        matrix = self.matrix(partition.graph)
+
+        districts = sorted(partition.parts)
+        district_index = {district: idx for idx, district in enumerate(districts)}
+
+        assignment = partition.assignment
+        rows = np.array([district_index[assignment[node]] for node in self._node_index])
+
+        totals = np.zeros((len(districts), len(self.columns)))
+        np.add.at(totals, rows, matrix)
+
+        return DistrictTotals(districts, self.columns, totals)
+
+    def __call__(self, partition: gc.Partition) -> DistrictTotals:
+
+        if partition.parent is None:
+            return self.totals(partition)
+
+        matrix = self.matrix(partition.graph)
+        node_index = self._node_index
+
+        parent_totals = partition.parent[self.alias]
+        totals = parent_totals.totals.copy()
+
+        flips = partition.flips
+        if flips:
+            district_index = parent_totals.district_index
+            parent_assignment = partition.parent.assignment
+
+            flipped = matrix[[node_index[node] for node in flips]]
+            np.add.at(totals, [district_index[district] for district in flips.values()], flipped)
+            np.subtract.at(totals, [district_index[parent_assignment[node]] for node in flips], flipped)
+
+        return DistrictTotals(parent_totals.districts, self.columns, totals)
+
+class TallyColumn:
+    """
+    Updater exposing one column of a MultiTally as a dict by district, so partition[col][district] still works.
+    """
+
+    def __init__(self, col: str, alias: str = 'attribute_totals') -> None:
+
+        self.col = col
+        self.alias = alias
+
+    def __call__(self, partition: gc.Partition) -> Dict:
+        return partition[self.alias][self.col]
+
+def make_tally_updaters(columns: Iterable[str], alias: str = 'attribute_totals') -> Dict:
+    """
+    Return a MultiTally of the columns under alias plus a TallyColumn per column, in place of one
+    gc.updaters.Tally per column.
+    """
+
+    columns = list(columns)
+
+    updaters = {alias: MultiTally(columns, alias=alias)}
+    updaters.update({col: TallyColumn(col, alias=alias) for col in columns})
+
+    return updaters
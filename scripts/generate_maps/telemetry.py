@@ -0,0 +1,195 @@
+"""
+Step by step telemetry of a ReCom chain: timings, rejections by constraint and unique plans found.
+"""
+from typing import (Callable, Iterator, List, Optional, Set)
+
+import json
+import pathlib
+import time
+
+import gerrychain as gc
+
+class ChainTelemetry:
+    """
+    Time the proposal and constraints of a chain and record every step.
+
+    Wrap the chain's proposal and constraints with timed_proposal and timed_constraints before building
+    the gc.MarkovChain, then iterate the chain through iter_steps. gc.MarkovChain retries proposals that
+    fail a constraint without yielding them, so proposals and constraint failures are counted in the
+    wrappers. Counters cover every step; a JSON line per step is only written every sample_every steps
+    and for steps slower than slow_step_seconds.
+    """
+
+    def __init__(self,
+                 records_path: Optional[str] = None,
+                 sample_every: int = 1,
+                 slow_step_seconds: Optional[float] = None) -> None:
+
+        self.records_path = pathlib.Path(records_path) if records_path else None
+        self.sample_every = sample_every
+        self.slow_step_seconds = slow_step_seconds
+
+        self._reset_step()
+
+        self.summary = {}
+
+    def _reset_step(self) -> None:
+
+        self._step_proposals = 0
+        self._step_proposal_seconds = 0.0
+        self._step_constraint_seconds = 0.0
+        self._step_rejected_by = {}
+
+    def timed_proposal(self, proposal: Callable) -> Callable:
+        """
+        Return the proposal timed and counted into the current step.
+        """
+
+        def timed(partition: gc.Partition) -> gc.Partition:
+            start = time.perf_counter()
+            proposed = proposal(partition)
+            self._step_proposal_seconds += time.perf_counter() - start
+            self._step_proposals += 1
+            return proposed
+
+        return timed
+
+    def timed_constraints(self, constraints: List[Callable]) -> List[Callable]:
+        """
+        Return the constraints timed into the current step, counting the proposals each one rejects.
+        """
+
+        def timed_constraint(constraint: Callable) -> Callable:
+            name = getattr(constraint, '__name__', repr(constraint))
+
+            def timed(partition: gc.Partition) -> bool:
+                start = time.perf_counter()
+                is_valid = constraint(partition)
+                self._step_constraint_seconds += time.perf_counter() - start
+                # gc.Validator stops at the first failed constraint, so each proposal is counted once
+                if is_valid is False:
+                    self._step_rejected_by[name] = self._step_rejected_by.get(name, 0) + 1
+                return is_valid
+
+            timed.__name__ = name
+            return timed
+
+        return [timed_constraint(constraint) for constraint in constraints]
+
+    def iter_steps(self, chain: gc.MarkovChain, seen: Optional[Set] = None) -> Iterator[gc.Partition]:
+        """
+        Yield the states of the chain while recording each step.
+
+        seen - set of unique plan keys filled by the consumer, e.g. the one passed to
+               dedup.iter_unique_partitions, read after each step for the unique plan curve
+        Only the chain's own work is timed, not the consumer's while the generator is suspended.
+        """
+
+        summary = {
+            'steps': 0,
+            'proposals': 0,
+            'accepted': 0,
+            'rejected': 0,
+            'not_accepted': 0,
+            'self_loops': 0,
+            'rejected_by': {},
+            'proposal_seconds': 0.0,
+            'constraint_seconds': 0.0,
+            'chain_seconds': 0.0,
+        }
+        self.summary = summary
+
+        # forget the validation of the initial state in gc.MarkovChain.__init__
+        self._reset_step()
+
+        records = open(self.records_path, 'w') if self.records_path else None
+
+        try:
+            wall_start = time.perf_counter()
+            states = iter(chain)
+            previous = None
+            step = 0
+
+            while True:
+                step_start = time.perf_counter()
+                try:
+                    partition = next(states)
+                except StopIteration:
+                    break
+                step_seconds = time.perf_counter() - step_start
+
+                if previous is None:
+                    outcome = 'initial'
+                elif partition is previous:
+                    outcome = 'not_accepted'
+                elif all(previous.assignment[node] == district for node, district in partition.flips.items()):
+                    outcome = 'self_loop'
+                else:
+                    outcome = 'accepted'
+
+                summary['chain_seconds'] += step_seconds
+                summary['proposals'] += self._step_proposals
+                summary['proposal_seconds'] += self._step_proposal_seconds
+                summary['constraint_seconds'] += self._step_constraint_seconds
+                for name, count in self._step_rejected_by.items():
+                    summary['rejected_by'][name] = summary['rejected_by'].get(name, 0) + count
+
+                if previous is not None:
+                    summary['steps'] += 1
+                    summary['not_accepted'] += outcome == 'not_accepted'
+                    summary['accepted'] += outcome in ('accepted', 'self_loop')
+                    summary['self_loops'] += outcome == 'self_loop'
+
+                record = {
+                    'step': step,
+                    'outcome': outcome,
+                    'proposals': self._step_proposals,
+                    'rejected_by': self._step_rejected_by,
+                    'proposal_seconds': self._step_proposal_seconds,
+                    'constraint_seconds': self._step_constraint_seconds,
+                    'step_seconds': step_seconds,
+                    'chain_seconds': summary['chain_seconds'],
+                }
+                self._reset_step()
+                previous = partition
+
+                yield partition
+
+                # the consumer has deduplicated this step's plan by now
+                record['n_unique'] = len(seen) if seen is not None else None
+
+                is_slow = self.slow_step_seconds is not None and step_seconds > self.slow_step_seconds
+                if records is not None and (step % self.sample_every == 0 or is_slow):
+                    records.write(json.dumps(record) + '\n')
+
+                step += 1
+
+            # proposals retried after failing a constraint never become steps
+            summary['rejected'] = summary['proposals'] - summary['steps']
+            summary['wall_seconds'] = time.perf_counter() - wall_start
+            summary['steps_per_second'] = summary['steps'] / summary['chain_seconds'] if summary['chain_seconds'] else None
+            summary['n_unique'] = len(seen) if seen is not None else None
+
+        finally:
+            if records is not None:
+                records.close()
+
+    def write_summary(self, summary_path: str) -> None:
+        """
+        Write the counters of the last iter_steps run as JSON.
+        """
+
+        pathlib.Path(summary_path).write_text(json.dumps(self.summary, indent=2))
+
+    def describe(self) -> str:
+        """
+        Return a one line summary of the last iter_steps run.
+        """
+
+        summary = self.summary
+        rejected_by = ', '.join(f'{name} {count}' for name, count in summary['rejected_by'].items()) or 'none'
+
+        return (f"{summary['steps']} steps at {summary.get('steps_per_second') or 0:.0f} steps/s "
+                f"(proposal {summary['proposal_seconds']:.1f}s, constraints {summary['constraint_seconds']:.1f}s), "
+                f"{summary['accepted']} accepted ({summary['self_loops']} self loops), "
+                f"{summary.get('rejected', 0)} proposals rejected by {rejected_by}")
@@ -0,0 +1,84 @@
+import random
+
+import networkx as nx
+
+import gerrychain as gc
+
+import common
+import dedup
+import enumeration
+from conftest import grid_graph
+
+def tuple_key(partition):
+    """
+    The sorted tuple of small district nodes that filter_unique_partitions used to key plans on.
+    """
+
+    district_pop = partition['cvap_total']
+    small_district_id = 1 if district_pop[1] < district_pop[2] else 2
+
+    return tuple(sorted(node for node, district in partition.assignment.items() if district == small_district_id))
+
+def tuple_filter(chain):
+
+    partition_dict = {}
+    for partition in chain:
+        partition_dict.setdefault(tuple_key(partition), partition)
+
+    return list(partition_dict.values())
+
+def test_unique_plans_match_tuple_filter():
+
+    random.seed(0)
+    graph = grid_graph(4, 4)
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+
+    unequal_size_constraint = common.make_unequal_size_constraint(0.2, 0.45)
+    chain = list(common.make_chain(graph, updaters, unequal_size_constraint, 500))
+
+    unique_plans = list(dedup.iter_unique_plans(chain))
+
+    expected = tuple_filter(chain)
+    assert [partition for _, partition in unique_plans] == expected
+    assert len(expected) < len(chain)
+
+    encoder = dedup.PlanKeyEncoder(graph)
+    for key, partition in unique_plans:
+        assert encoder.decode(key) == frozenset(tuple_key(partition))
+
+def test_key_round_trip_ignores_labels():
+
+    graph = grid_graph(3, 3)
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+    encoder = dedup.PlanKeyEncoder(graph)
+
+    for small_district in enumeration.enumerate_small_districts(graph, 'cvap_total', 0.0, 0.5):
+        partition = enumeration.partition_from_small_district(graph, small_district, updaters)
+        swapped = gc.GeographicPartition(graph, {node: 3 - district for node, district in partition.assignment.items()}, updaters)
+
+        key = encoder.encode(partition)
+        assert encoder.decode(key) == small_district
+        assert encoder.encode(swapped) == key
+
+def test_tie_keeps_district_without_lowest_node():
+
+    graph = gc.Graph(nx.path_graph(4))
+    nx.set_node_attributes(graph, 1, 'cvap_total')
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+    encoder = dedup.PlanKeyEncoder(graph)
+
+    for assignment in ({0: 1, 1: 1, 2: 2, 3: 2}, {0: 2, 1: 2, 2: 1, 3: 1}):
+        partition = gc.Partition(graph, assignment, updaters)
+        assert encoder.decode(encoder.encode(partition)) == frozenset({2, 3})
+
+def test_seen_is_shared_between_chains():
+
+    graph = grid_graph(3, 3)
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+    partitions = enumeration.enumerate_partitions(graph, 'cvap_total', 0.0, 0.5, updaters)
+
+    seen = set()
+    first = list(dedup.iter_unique_partitions(partitions[:5], seen=seen))
+    second = list(dedup.iter_unique_partitions(partitions, seen=seen))
+
+    assert first + second == partitions
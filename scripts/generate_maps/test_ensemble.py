@@ -0,0 +1,30 @@
+import ensemble
+from conftest import grid_geodataframe
+
+def test_same_seeds_give_same_plans(tmp_path):
+
+    shapefile_path = tmp_path / 'bg.shp'
+    grid_geodataframe(4, 4)[['GEOID', 'cvap_total', 'geometry']].to_file(shapefile_path)
+
+    seeds = ensemble.make_seeds(3, base_seed=7)
+    assert seeds == ensemble.make_seeds(3, base_seed=7)
+    assert len(set(seeds)) == 3
+
+    results = [ensemble.run_ensemble(shapefile_path, seeds, 0.2, 0.45, 100, n_workers=n_workers)
+               for n_workers in (1, 2, 3)]
+
+    keys, chain_summaries = results[0]
+    assert len(keys) == len(set(keys))
+    assert len(keys) <= sum(chain_summary['n_unique'] for chain_summary in chain_summaries)
+
+    for chain_summary in chain_summaries:
+        assert chain_summary['steps'] == 99
+        assert chain_summary['accepted'] + chain_summary['not_accepted'] == chain_summary['steps']
+        assert chain_summary['rejected'] == sum(chain_summary['rejected_by'].values())
+
+    # timings differ between runs, the plans and counts do not
+    counts = ['n_unique', 'steps', 'proposals', 'accepted', 'rejected', 'self_loops', 'rejected_by']
+    for other_keys, other_summaries in results[1:]:
+        assert other_keys == keys
+        assert [{count: summary[count] for count in counts} for summary in other_summaries] == \
+               [{count: summary[count] for count in counts} for summary in chain_summaries]
@@ -0,0 +1,51 @@
+import itertools
+
+import networkx as nx
+import pytest
+
+import enumeration
+from conftest import grid_graph
+
+def brute_force_small_districts(graph, lower_bound_prop, upper_bound_prop):
+    """
+    Check every subset of nodes against the rules of enumerate_small_districts.
+    """
+
+    nodes = sorted(graph.nodes)
+    total = sum(graph.nodes[n]['cvap_total'] for n in nodes)
+
+    small_districts = set()
+    for size in range(1, len(nodes)):
+        for subset in itertools.combinations(nodes, size):
+            complement = [n for n in nodes if n not in subset]
+            subset_pop = sum(graph.nodes[n]['cvap_total'] for n in subset)
+
+            if 2 * subset_pop > total:
+                continue
+            if 2 * subset_pop == total and nodes[0] in subset:
+                continue
+            if not lower_bound_prop <= subset_pop / total <= upper_bound_prop:
+                continue
+            if not nx.is_connected(graph.subgraph(subset)) or not nx.is_connected(graph.subgraph(complement)):
+                continue
+
+            small_districts.add(frozenset(subset))
+
+    return small_districts
+
+@pytest.mark.parametrize('lower_bound_prop, upper_bound_prop', [(0.35, 0.45), (0.15, 0.25), (0.0, 0.5)])
+def test_enumerate_small_districts_matches_brute_force(lower_bound_prop, upper_bound_prop):
+
+    graph = grid_graph(3, 3)
+
+    small_districts = enumeration.enumerate_small_districts(graph, 'cvap_total', lower_bound_prop, upper_bound_prop)
+
+    assert len(small_districts) == len(set(small_districts))
+    assert set(small_districts) == brute_force_small_districts(graph, lower_bound_prop, upper_bound_prop)
+
+def test_enumerate_small_districts_breaks_ties_by_lowest_node():
+
+    graph = nx.path_graph(4)
+    nx.set_node_attributes(graph, 1, 'cvap_total')
+
+    assert enumeration.enumerate_small_districts(graph, 'cvap_total', 0.5, 0.5) == [frozenset({2, 3})]
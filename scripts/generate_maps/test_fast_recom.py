@@ -0,0 +1,92 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import gerrychain as gc
+import gerrychain.constraints as constraints
+
+import common
+import enumeration
+import fast_recom
+from conftest import grid_graph
+
+def tree_of(csr, parent, in_region):
+    """
+    Return the tree drawn by wilson_tree as a networkx graph on node indices.
+    """
+
+    tree = nx.Graph()
+    tree.add_nodes_from(np.flatnonzero(in_region).tolist())
+    tree.add_edges_from((int(node), int(parent[node])) for node in np.flatnonzero(in_region) if parent[node] >= 0)
+
+    return tree
+
+@pytest.mark.parametrize('seed', range(5))
+def test_subtree_pops_match_dfs(seed):
+
+    random.seed(seed)
+    graph = grid_graph(4, 5, seed=seed)
+    csr = fast_recom.CSRGraph(graph, 'cvap_total')
+
+    # a connected region leaving out the first column
+    in_region = np.array([csr.nodes[idx] % 5 != 0 for idx in range(len(csr))])
+
+    parent, depth, root = csr.wilson_tree(in_region)
+    subtree, levels = csr.subtree_pops(in_region, parent, depth)
+
+    tree = tree_of(csr, parent, in_region)
+    assert nx.is_tree(tree)
+    assert all(graph.has_edge(csr.nodes[u], csr.nodes[v]) for u, v in tree.edges)
+
+    # population below each node when the tree hangs from the root
+    dfs_tree = nx.dfs_tree(tree, root)
+    for node in tree.nodes:
+        below = [node] + list(nx.descendants(dfs_tree, node))
+        assert subtree[node] == pytest.approx(csr.pops[below].sum())
+        assert depth[node] == nx.shortest_path_length(tree, root, node)
+
+    assert np.all(subtree[~in_region] == 0)
+    assert sorted(np.concatenate(levels).tolist()) == np.flatnonzero(in_region).tolist()
+
+@pytest.mark.parametrize('proposal_engine', ['array', 'unequal'])
+def test_chain_only_visits_valid_plans(proposal_engine):
+
+    random.seed(0)
+    graph = grid_graph(3, 4)
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+
+    unequal_size_constraint = common.make_unequal_size_constraint(0.2, 0.45)
+    valid = set(enumeration.enumerate_small_districts(graph, 'cvap_total', 0.2, 0.45))
+
+    chain = common.make_chain(graph, updaters, unequal_size_constraint, 200, proposal_engine=proposal_engine)
+
+    for partition in chain:
+        small_district_id = min(partition.parts, key=lambda district: partition['cvap_total'][district])
+        assert frozenset(partition.parts[small_district_id]) in valid
+
+def test_unequal_recom_only_proposes_inside_bounds():
+
+    random.seed(0)
+    graph = grid_graph(3, 4)
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+
+    unequal_size_constraint = common.make_unequal_size_constraint(0.2, 0.45)
+    initial_partition = common.make_chain(graph, updaters, unequal_size_constraint, 1).initial_state
+
+    proposal = fast_recom.UnequalRecom(graph, 'cvap_total', 0.2, 0.45)
+
+    partition = initial_partition
+    for _ in range(200):
+        partition = proposal(partition)
+        assert unequal_size_constraint(partition)
+        assert constraints.contiguous(partition)
+
+def test_tree_cut_recom_needs_balanced_cuts():
+
+    class NoCuts(fast_recom.TreeCutRecom):
+        pass
+
+    with pytest.raises(TypeError):
+        NoCuts(grid_graph(2, 2), 'cvap_total')
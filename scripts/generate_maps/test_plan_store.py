@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import plan_store
+
+N_PLANS = 203
+
+@pytest.fixture
+def store_and_table(tmp_path):
+
+    rng = np.random.default_rng(0)
+
+    geoids = [f'06001{idx:07d}' for idx in range(12)]
+    assignments = rng.integers(1, 3, (N_PLANS, len(geoids))).astype(np.int8)
+
+    perc = rng.integers(0, 20, N_PLANS).astype(float)
+    perc[rng.random(N_PLANS) < 0.1] = np.nan
+
+    stats_df = pd.DataFrame({
+        'map_id': np.arange(N_PLANS),
+        'SD_cvap_Asian_Alone_perc': perc,
+        'SD_quadrant': rng.choice(np.array(['NE', 'NW', 'SE', None], dtype=object), N_PLANS),
+    })
+
+    store_path = tmp_path / plan_store.STORE_NAME
+    plan_store.write_plan_store(stats_df, assignments, geoids, store_path)
+
+    return plan_store.PlanStore(store_path), stats_df, assignments, geoids
+
+@pytest.mark.parametrize('op', ['<', '<=', '>', '>=', '==', '!='])
+@pytest.mark.parametrize('value', [-1, 0, 7, 7.5, 19, 30])
+def test_range_predicates_match_pandas(store_and_table, op, value):
+
+    store, stats_df, _, _ = store_and_table
+
+    col = stats_df['SD_cvap_Asian_Alone_perc']
+    # NaNs never match, '!=' included
+    expected = {
+        '<': col < value,
+        '<=': col <= value,
+        '>': col > value,
+        '>=': col >= value,
+        '==': col == value,
+        '!=': col.notna() & (col != value),
+    }[op]
+
+    rows = store.query([f'SD_cvap_Asian_Alone_perc {op} {value}'])
+    assert rows.tolist() == np.flatnonzero(expected).tolist()
+
+@pytest.mark.parametrize('op', ['==', '!='])
+@pytest.mark.parametrize('value', ['NE', 'SW'])
+def test_category_predicates_match_pandas(store_and_table, op, value):
+
+    store, stats_df, _, _ = store_and_table
+
+    col = stats_df['SD_quadrant']
+    expected = col == value if op == '==' else col.notna() & (col != value)
+
+    assert store.query([f'SD_quadrant {op} {value}']).tolist() == np.flatnonzero(expected).tolist()
+
+def test_membership_and_conjunction(store_and_table):
+
+    store, stats_df, assignments, geoids = store_and_table
+
+    rows = store.query([f'SD contains {geoids[3]}', f'LD contains {geoids[5]}', 'map_id >= 50'])
+    expected = (assignments[:, 3] == 2) & (assignments[:, 5] == 1) & (stats_df['map_id'] >= 50)
+
+    assert rows.tolist() == np.flatnonzero(expected).tolist()
+
+def test_stats_round_trip(store_and_table):
+
+    store, stats_df, assignments, geoids = store_and_table
+
+    rows = np.array([0, 5, 17, N_PLANS - 1])
+    round_trip = store.stats(rows, geoids=True)
+
+    pd.testing.assert_frame_equal(round_trip.drop(columns=['LD_geoids', 'SD_geoids']),
+                                  stats_df.iloc[rows].reset_index(drop=True))
+
+    for row, sd_geoids in zip(rows, round_trip['SD_geoids']):
+        assert sd_geoids == ';'.join(geoid for geoid, district in zip(geoids, assignments[row]) if district == 2)
@@ -1,13 +1,13 @@
 # %%
 import gerrychain as gc
 import gerrychain.tree as gc_tree
-import geopandas as gpd
 from datetime import datetime
 
 import os 
 import pathlib
 
 from plot_partition import plot_partition
+import bundle
 
 now = datetime.now()
 date_string = now.strftime("%d-%m-%Y %H-%M-%S")
@@ -29,8 +29,9 @@ output_path = output_dir / f'{date_string}.png'
 #######################################################
 # sample and plot
 
-g = gc.Graph.from_file(filename=albany_bg_shapefile_path)
-gdf = gpd.read_file(filename=albany_bg_shapefile_path)
+jurisdiction = bundle.load_bundle(albany_bg_shapefile_path)
+g = jurisdiction.graph()
+gdf = jurisdiction.geodataframe()
 
 cvap_total_sum = sum(gdf['cvap_total'])
 
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import representatives
+import web_output
+
+def random_assignments(n_plans, n_nodes, n_distinct, seed=0):
+    """
+    Return plans drawn from n_distinct distinct plans, so many plans are duplicates.
+    """
+
+    rng = np.random.default_rng(seed)
+    distinct = rng.integers(1, 3, (n_distinct, n_nodes)).astype(np.int8)
+
+    return distinct[rng.integers(0, n_distinct, n_plans)]
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_pairwise_distances_match_direct(weighted):
+
+    assignments = random_assignments(40, 21, 40)
+    node_weights = np.arange(1, 22, dtype=float) if weighted else np.ones(21)
+
+    distances = representatives.pairwise_distances(web_output.pack_assignments(assignments),
+                                                    node_weights if weighted else None, chunk_size=16)
+
+    in_SD = assignments == 2
+    expected = (in_SD[:, None, :] != in_SD[None, :, :]) @ node_weights
+
+    np.testing.assert_allclose(distances, expected)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_every_cluster_has_plans(seed):
+
+    assignments = random_assignments(60, 12, 6, seed=seed)
+    map_ids = np.arange(100, 160)
+
+    representatives_df, labels = representatives.select_representatives(assignments, map_ids, 8, seed=seed)
+
+    # at most one cluster per distinct plan
+    assert len(representatives_df) <= 6
+    assert (representatives_df['cluster_size'] > 0).all()
+    assert representatives_df['cluster_size'].sum() == len(assignments)
+    assert not representatives_df['mean_distance'].isna().any()
+    assert set(labels) == set(representatives_df['cluster'])
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+import gerrychain as gc
+
+import common
+import enumeration
+import stats
+import tally
+from conftest import grid_geodataframe
+
+@pytest.mark.parametrize('n_district_electeds', [[2, 3], [4, 1]])
+def test_ensemble_stats_match_partition_stats(n_district_electeds):
+
+    gdf = grid_geodataframe(3, 4)
+    graph = gc.Graph.from_geodataframe(gdf)
+
+    tally_cols = [col for col in gdf.columns if 'cvap' in col]
+    tally_cols += [col for col in gdf.columns if ('house' in col or 'income' in col) and 'tot' not in col]
+    updaters = tally.make_tally_updaters(tally_cols)
+
+    partitions = enumeration.enumerate_partitions(graph, 'cvap_total', 0.2, 0.5, updaters)
+    partition_infos = [common.reorganize_partition_info(partition, n_district_electeds=n_district_electeds)
+                       for partition in partitions]
+
+    expected = pd.concat([common.calc_partition_stats(idx, partition_info, gdf)
+                          for idx, partition_info in enumerate(partition_infos)], ignore_index=True)
+
+    assignments = stats.assignment_matrix(partition_infos, gdf['GEOID'])
+    ensemble_stats = stats.calc_ensemble_stats(assignments, gdf, n_district_electeds)
+
+    assert list(ensemble_stats.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(ensemble_stats, expected.infer_objects(), check_dtype=False)
+
+def test_quadrants_match_dissolved_centroids():
+
+    gdf = grid_geodataframe(4, 4)
+    graph = gc.Graph.from_geodataframe(gdf)
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+
+    partitions = enumeration.enumerate_partitions(graph, 'cvap_total', 0.1, 0.3, updaters)
+    partition_infos = [common.reorganize_partition_info(partition) for partition in partitions]
+    assignments = stats.assignment_matrix(partition_infos, gdf['GEOID'])
+
+    center = gdf.unary_union.centroid
+    for quadrant, assignment in zip(stats.calc_sd_quadrants(assignments, gdf), assignments):
+        centroid = gdf[assignment == 2].unary_union.centroid
+        if centroid.x == center.x or centroid.y == center.y:
+            assert quadrant is None
+        else:
+            assert quadrant == ('N' if centroid.y > center.y else 'S') + ('E' if centroid.x > center.x else 'W')
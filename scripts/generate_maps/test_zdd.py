@@ -0,0 +1,48 @@
+import networkx as nx
+import pytest
+
+import gerrychain as gc
+
+import dedup
+import enumeration
+import zdd
+from conftest import grid_graph
+
+@pytest.mark.parametrize('lower_bound_prop, upper_bound_prop', [(0.35, 0.45), (0.15, 0.25), (0.0, 0.5), (0.49, 0.5)])
+def test_diagram_matches_enumeration(lower_bound_prop, upper_bound_prop):
+
+    graph = grid_graph(3, 4)
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+
+    diagram = zdd.build_plan_diagram(graph, 'cvap_total', lower_bound_prop, upper_bound_prop)
+    partitions = enumeration.enumerate_partitions(graph, 'cvap_total', lower_bound_prop, upper_bound_prop, updaters)
+
+    assert diagram.count() == len(partitions)
+    assert set(diagram) == {frozenset(partition.parts[2]) for partition in partitions}
+
+def test_diagram_breaks_ties_like_enumeration():
+
+    graph = nx.grid_2d_graph(2, 3)
+    nx.set_node_attributes(graph, 1, 'cvap_total')
+
+    diagram = zdd.build_plan_diagram(graph, 'cvap_total', 0.5, 0.5)
+
+    assert set(diagram) == set(enumeration.enumerate_small_districts(graph, 'cvap_total', 0.5, 0.5))
+
+def test_samples_are_valid_plans():
+
+    graph = grid_graph(3, 4)
+    updaters = {'cvap_total': gc.updaters.Tally('cvap_total')}
+
+    diagram = zdd.build_plan_diagram(graph, 'cvap_total', 0.2, 0.45)
+    valid = set(diagram)
+
+    samples = zdd.sample_partitions(graph, diagram, 2_000, updaters, seed=0)
+    assert not isinstance(samples, list)
+
+    seen = set()
+    for partition in dedup.iter_unique_partitions(samples, seen=seen):
+        assert frozenset(partition.parts[2]) in valid
+
+    # 2,000 uniform draws from under a hundred plans reach every one of them
+    assert len(seen) == diagram.count()
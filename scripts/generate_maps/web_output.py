@@ -0,0 +1,179 @@
+"""
+Compact output of an ensemble: block group geometry written once, a bit packed assignment matrix and a static
+HTML explorer that draws any plan in the browser.
+"""
+from typing import Dict
+
+import base64
+import html
+import json
+import pathlib
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+EXPLORER_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+  body { font-family: sans-serif; margin: 1em; }
+  #controls { margin-bottom: 0.5em; }
+  #layout { display: flex; gap: 1em; align-items: flex-start; }
+  svg path { stroke-width: 1.5; vector-effect: non-scaling-stroke; }
+  table { border-collapse: collapse; font-size: 12px; }
+  td { padding: 1px 6px; border-bottom: 1px solid #ddd; }
+  td:last-child { text-align: right; }
+</style>
+</head>
+<body>
+<h3>__TITLE__</h3>
+<div id="controls">
+  <button id="prev">&lt;</button>
+  plan <input id="plan" type="number" min="0" value="0" style="width: 6em"> of <span id="n_plans"></span>
+  <button id="next">&gt;</button>
+  <a id="map_png" target="_blank">map png</a> <a id="map_stats_png" target="_blank">stats png</a>
+</div>
+<div id="layout">
+  <svg id="map" width="600" height="500"></svg>
+  <table id="stats"></table>
+</div>
+<script>
+const geometry = __GEOMETRY__;
+// stats as {columns: [...], data: [[...], ...]}, one row of values per plan
+const statsTable = __STATS__;
+const nPlans = statsTable.data.length;
+const nNodes = __N_NODES__;
+const rowBytes = __ROW_BYTES__;
+const packed = Uint8Array.from(atob("__ASSIGNMENTS__"), c => c.charCodeAt(0));
+const colors = {1: "green", 2: "blue"};
+
+// equirectangular projection scaled to the svg
+const svg = document.getElementById("map");
+const coords = geometry.features.flatMap(f => (f.geometry.type === "Polygon" ? [f.geometry.coordinates] : f.geometry.coordinates).flat(2));
+// a loop, spreading thousands of coordinates into Math.min overflows the stack
+let [x0, x1, y0, y1] = [Infinity, -Infinity, Infinity, -Infinity];
+for (const [x, y] of coords) {
+  x0 = Math.min(x0, x); x1 = Math.max(x1, x);
+  y0 = Math.min(y0, y); y1 = Math.max(y1, y);
+}
+const kx = Math.cos((y0 + y1) / 2 * Math.PI / 180);
+const scale = Math.min(svg.width.baseVal.value / ((x1 - x0) * kx), svg.height.baseVal.value / (y1 - y0));
+const project = c => [((c[0] - x0) * kx * scale).toFixed(1), ((y1 - c[1]) * scale).toFixed(1)];
+
+const paths = geometry.features.map(f => {
+  const polygons = f.geometry.type === "Polygon" ? [f.geometry.coordinates] : f.geometry.coordinates;
+  const d = polygons.flat().map(ring => "M" + ring.map(c => project(c).join(",")).join("L") + "Z").join("");
+  const path = document.createElementNS("http://www.w3.org/2000/svg", "path");
+  path.setAttribute("d", d);
+  path.appendChild(document.createElementNS("http://www.w3.org/2000/svg", "title")).textContent = f.properties.GEOID;
+  svg.appendChild(path);
+  return path;
+});
+
+function district(plan, node) {
+  return (packed[plan * rowBytes + (node >> 3)] >> (node & 7)) & 1 ? 2 : 1;
+}
+
+function statsRow(plan) {
+  return Object.fromEntries(statsTable.columns.map((column, i) => [column, statsTable.data[plan][i]]));
+}
+
+function draw(plan) {
+  plan = Math.max(0, Math.min(nPlans - 1, plan));
+  const stats = statsRow(plan);
+  document.getElementById("plan").value = plan;
+  paths.forEach((path, node) => {
+    const color = colors[district(plan, node)];
+    path.setAttribute("fill", color);
+    path.setAttribute("fill-opacity", 0.25);
+    path.setAttribute("stroke", color);
+  });
+  document.getElementById("map_png").href = `maps/${stats.map_id}_map.png`;
+  document.getElementById("map_stats_png").href = `maps/${stats.map_id}_map_stats.png`;
+  document.getElementById("stats").innerHTML = Object.entries(stats)
+    .filter(([k]) => !k.endsWith("_geoids"))
+    .map(([k, v]) => `<tr><td>${k}</td><td>${typeof v === "number" && !Number.isInteger(v) ? v.toFixed(2) : v}</td></tr>`).join("");
+}
+
+document.getElementById("n_plans").textContent = nPlans;
+document.getElementById("plan").onchange = e => draw(+e.target.value);
+document.getElementById("prev").onclick = () => draw(+document.getElementById("plan").value - 1);
+document.getElementById("next").onclick = () => draw(+document.getElementById("plan").value + 1);
+draw(0);
+</script>
+</body>
+</html>
+"""
+
+def pack_assignments(assignments: np.ndarray) -> np.ndarray:
+    """
+    Pack an (n_plans x n_nodes) assignment matrix to one bit per node, set for the small district.
+    """
+
+    return np.packbits(assignments == 2, axis=1, bitorder='little')
+
+def simplified_geojson(geodataframe: gpd.GeoDataFrame, simplify_tolerance: float) -> Dict:
+    """
+    Return the block group outlines in EPSG:4326 as GeoJSON with only the GEOID property.
+    """
+
+    gdf = geodataframe.loc[:, ['GEOID', 'geometry']].to_crs('EPSG:4326')
+    gdf['geometry'] = gdf.geometry.simplify(simplify_tolerance, preserve_topology=True)
+
+    geojson = json.loads(gdf.to_json(drop_id=True))
+
+    # 6 decimals is about 10 cm, plenty for a district map
+    def round_coords(coords):
+        if isinstance(coords[0], (int, float)):
+            return [round(c, 6) for c in coords]
+        return [round_coords(c) for c in coords]
+
+    for feature in geojson['features']:
+        feature['geometry']['coordinates'] = round_coords(feature['geometry']['coordinates'])
+        feature.pop('bbox', None)
+    geojson.pop('bbox', None)
+
+    return geojson
+
+def script_json(obj) -> str:
+    """
+    Dump obj as compact JSON that can be inlined in a <script> element.
+    """
+
+    return json.dumps(obj, separators=(',', ':')).replace('</', '<\\/')
+
+def write_web_output(assignments: np.ndarray,
+                     stats_df: pd.DataFrame,
+                     geodataframe: gpd.GeoDataFrame,
+                     output_dir: pathlib.Path,
+                     title: str = 'district maps',
+                     simplify_tolerance: float = 0.00002) -> None:
+    """
+    Write geometry.geojson, assignments.bin and explorer.html to output_dir.
+
+    assignments - (n_plans x n_nodes) array of district ids in geodataframe row order, rows matching stats_df
+    assignments.bin holds one row of ceil(n_nodes / 8) bytes per plan, bit i (little endian within a byte)
+    set when node i is in the small district. explorer.html embeds everything and needs no server.
+    """
+
+    geojson = simplified_geojson(geodataframe, simplify_tolerance)
+    packed = pack_assignments(assignments)
+
+    (output_dir / 'geometry.geojson').write_text(json.dumps(geojson, separators=(',', ':')))
+    (output_dir / 'assignments.bin').write_bytes(packed.tobytes())
+
+    # column names once rather than repeated in every plan's record
+    stats_table = json.loads(stats_df.drop(columns=['LD_geoids', 'SD_geoids'], errors='ignore').to_json(orient='split', index=False))
+
+    explorer = (EXPLORER_TEMPLATE
+                .replace('__TITLE__', html.escape(title))
+                .replace('__GEOMETRY__', script_json(geojson))
+                .replace('__STATS__', script_json(stats_table))
+                .replace('__N_NODES__', str(assignments.shape[1]))
+                .replace('__ROW_BYTES__', str(packed.shape[1]))
+                .replace('__ASSIGNMENTS__', base64.b64encode(packed.tobytes()).decode()))
+
+    (output_dir / 'explorer.html').write_text(explorer)
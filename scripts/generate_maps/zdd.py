@@ -0,0 +1,310 @@
+"""
+Frontier based zero-suppressed decision diagram (ZDD) of the valid two district plans of a graph.
+
+Each variable of the diagram is a node of the graph and a set in the diagram is the set of nodes in
+the small district. The diagram is built top down one graph node at a time, keeping only what the
+remaining nodes need to know about the processed ones: the district and connected component of each
+processed node that still has unprocessed neighbors (the frontier), the small district population so
+far, and whether each district has already been closed off. Equal states are merged, which is what
+keeps the diagram small enough to count and sample from on graphs far too large to enumerate.
+"""
+from typing import (Dict, FrozenSet, Iterator, List, Optional, Tuple)
+
+import random
+
+import networkx as nx
+
+import gerrychain as gc
+
+import enumeration
+
+# ids of the terminal nodes
+FALSE = 0
+TRUE = 1
+
+class PlanDiagram:
+    """
+    A reduced ZDD of small district node sets.
+
+    order - graph nodes in variable order
+    levels, los, his - variable index, 0-child and 1-child of each diagram node (terminals first)
+    root - id of the root diagram node
+    """
+
+    def __init__(self, order: List, levels: List[int], los: List[int], his: List[int], root: int) -> None:
+
+        self.order = order
+        self.levels = levels
+        self.los = los
+        self.his = his
+        self.root = root
+
+        # children always have lower ids than their parents
+        counts = [0, 1]
+        for node_id in range(2, len(levels)):
+            counts.append(counts[los[node_id]] + counts[his[node_id]])
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def count(self) -> int:
+        """
+        Return the exact number of plans in the diagram.
+        """
+
+        return self.counts[self.root]
+
+    def sample(self, n: int, seed: Optional[int] = None) -> List[FrozenSet]:
+        """
+        Draw n small districts uniformly at random (with replacement).
+        """
+
+        return list(self.iter_sample(n, seed=seed))
+
+    def iter_sample(self, n: int, seed: Optional[int] = None) -> Iterator[FrozenSet]:
+        """
+        Yield n small districts drawn uniformly at random (with replacement) one at a time.
+        """
+
+        if self.count() == 0:
+            raise ValueError('the diagram contains no plans')
+
+        rng = random.Random(seed)
+
+        for _ in range(n):
+
+            small_district_nodes = []
+            node_id = self.root
+            while node_id > TRUE:
+                hi = self.his[node_id]
+                if rng.randrange(self.counts[node_id]) < self.counts[hi]:
+                    small_district_nodes.append(self.order[self.levels[node_id]])
+                    node_id = hi
+                else:
+                    node_id = self.los[node_id]
+
+            yield frozenset(small_district_nodes)
+
+    def __iter__(self) -> Iterator[FrozenSet]:
+        """
+        Yield every small district in the diagram.
+        """
+
+        stack = [(self.root, ())]
+        while stack:
+            node_id, small_district_nodes = stack.pop()
+
+            if node_id == TRUE:
+                yield frozenset(small_district_nodes)
+            elif node_id != FALSE:
+                stack.append((self.los[node_id], small_district_nodes))
+                stack.append((self.his[node_id], small_district_nodes + (self.order[self.levels[node_id]],)))
+
+def _variable_order(graph: nx.Graph) -> List:
+    """
+    Order nodes breadth first from a peripheral node to keep the frontier narrow.
+    """
+
+    start = min(graph.nodes)
+    far_node = list(nx.bfs_tree(graph, start))[-1]
+
+    return list(nx.bfs_tree(graph, far_node))
+
+def _normalize(colors: Tuple, comps: List) -> Tuple:
+    """
+    Relabel components in order of first appearance so equal states compare equal.
+    """
+
+    relabel = {}
+    for comp in comps:
+        if comp not in relabel:
+            relabel[comp] = len(relabel)
+
+    return colors, tuple(relabel[comp] for comp in comps)
+
+def build_plan_diagram(graph: nx.Graph,
+                       pop_col: str,
+                       lower_bound_prop: float,
+                       upper_bound_prop: float,
+                       pop_resolution: float = 1) -> PlanDiagram:
+    """
+    Build a ZDD of every valid two district plan of the graph.
+
+    A plan is valid when both districts are connected and the smallest district is between the
+    proportion bounds, matching unequal_size_constraint_template. When both districts have the same
+    population only the district not containing the lowest ordered node is kept.
+
+    Every distinct small district population is a separate state, so the diagram grows with the number
+    of reachable population values. Setting pop_resolution above 1 rounds populations to multiples of
+    it, which merges states at the cost of making the bounds approximate.
+
+    graph - a networkx or gerrychain graph, must be connected
+    pop_col - node attribute used for population
+    lower_bound_prop - float between 0 and 1
+    upper_bound_prop - float between 0 and 1
+    pop_resolution - population unit that populations are rounded to
+    """
+
+    order = _variable_order(graph)
+    n_vars = len(order)
+    position = {node: idx for idx, node in enumerate(order)}
+
+    if n_vars != graph.number_of_nodes():
+        raise ValueError('graph must be connected')
+
+    pops = [round(graph.nodes[node][pop_col] / pop_resolution) for node in order]
+    total = sum(pops)
+
+    min_pop = lower_bound_prop * total
+    max_pop = min(upper_bound_prop * total, total / 2)
+    tie_possible = 2 * max_pop >= total
+
+    anchor = position[min(graph.nodes)]
+
+    remaining_pop = [0] * (n_vars + 1)
+    for idx in reversed(range(n_vars)):
+        remaining_pop[idx] = remaining_pop[idx + 1] + pops[idx]
+
+    # frontier after each node is processed, as slots into the previous frontier plus the new node
+    last_needed = [max([idx] + [position[u] for u in graph.neighbors(node)]) for idx, node in enumerate(order)]
+    frontiers = [tuple(u for u in range(idx + 1) if last_needed[u] > idx) for idx in range(n_vars)]
+
+    neighbor_slots = []
+    keep_slots = []
+    leave_slots = []
+    for idx, node in enumerate(order):
+        extended = (frontiers[idx - 1] if idx > 0 else ()) + (idx,)
+        slot = {u: s for s, u in enumerate(extended)}
+        neighbor_slots.append([slot[position[u]] for u in graph.neighbors(node) if position[u] < idx])
+        keep_slots.append([slot[u] for u in frontiers[idx]])
+        leave_slots.append([s for s, u in enumerate(extended) if u not in frontiers[idx]])
+
+    # state: (colors, comps, small district pop, small district closed, large district closed, lowest node in small)
+    def child(idx, state, color):
+
+        colors, comps, pop_s, closed_s, closed_t, lowest_in_s = state
+
+        if (closed_s if color else closed_t):
+            return FALSE
+
+        if color:
+            pop_s += pops[idx]
+            if pop_s > max_pop:
+                return FALSE
+        if pop_s + remaining_pop[idx + 1] < min_pop:
+            return FALSE
+
+        if idx == anchor:
+            lowest_in_s = bool(color) and tie_possible
+
+        # add the node to the frontier and merge it with same district neighbors
+        colors = colors + (color,)
+        comps = comps + (-1,)
+
+        merged = {comps[s] for s in neighbor_slots[idx] if colors[s] == color}
+        if merged:
+            comps = tuple(-1 if comp in merged else comp for comp in comps)
+
+        # close off components that leave the frontier
+        keep = keep_slots[idx]
+        frontier_comps = {comps[s] for s in keep}
+        for s in leave_slots[idx]:
+            comp = comps[s]
+            if comp in frontier_comps:
+                continue
+
+            if any(colors[k] == colors[s] for k in keep):
+                return FALSE
+
+            if colors[s]:
+                if closed_s:
+                    return FALSE
+                closed_s = True
+            else:
+                if closed_t:
+                    return FALSE
+                closed_t = True
+            frontier_comps.add(comp)
+
+        if idx == n_vars - 1:
+            if not (closed_s and closed_t) or pop_s < min_pop:
+                return FALSE
+            if 2 * pop_s == total and lowest_in_s:
+                return FALSE
+            return TRUE
+
+        new_colors, new_comps = _normalize(tuple(colors[s] for s in keep), [comps[s] for s in keep])
+
+        return (new_colors, new_comps, pop_s, closed_s, closed_t, lowest_in_s)
+
+    # build unreduced diagram top down, a level at a time
+    levels = [None, None]
+    los = [FALSE, TRUE]
+    his = [FALSE, TRUE]
+
+    level_states = {((), (), 0, False, False, False): 2}
+    levels.append(0)
+    los.append(None)
+    his.append(None)
+
+    for idx in range(n_vars):
+        next_states = {}
+        for state, node_id in level_states.items():
+            for color in (0, 1):
+                child_state = child(idx, state, color)
+
+                if child_state in (FALSE, TRUE):
+                    child_id = child_state
+                elif child_state in next_states:
+                    child_id = next_states[child_state]
+                else:
+                    child_id = len(levels)
+                    next_states[child_state] = child_id
+                    levels.append(idx + 1)
+                    los.append(None)
+                    his.append(None)
+
+                if color:
+                    his[node_id] = child_id
+                else:
+                    los[node_id] = child_id
+
+        level_states = next_states
+
+    # reduce bottom up, giving children lower ids than parents
+    reduced = {FALSE: FALSE, TRUE: TRUE}
+    unique = {}
+    reduced_levels = [None, None]
+    reduced_los = [FALSE, TRUE]
+    reduced_his = [FALSE, TRUE]
+
+    for node_id in reversed(range(2, len(levels))):
+        lo = reduced[los[node_id]]
+        hi = reduced[his[node_id]]
+
+        if hi == FALSE:
+            reduced[node_id] = lo
+            continue
+
+        key = (levels[node_id], lo, hi)
+        if key not in unique:
+            unique[key] = len(reduced_levels)
+            reduced_levels.append(levels[node_id])
+            reduced_los.append(lo)
+            reduced_his.append(hi)
+        reduced[node_id] = unique[key]
+
+    return PlanDiagram(order, reduced_levels, reduced_los, reduced_his, reduced[2])
+
+def sample_partitions(graph: gc.Graph,
+                      diagram: PlanDiagram,
+                      n: int,
+                      updaters: Dict,
+                      seed: Optional[int] = None) -> Iterator[gc.Partition]:
+    """
+    Yield n plans drawn uniformly at random from the diagram as partitions, one at a time.
+    """
+
+    for nodes in diagram.iter_sample(n, seed=seed):
+        yield enumeration.partition_from_small_district(graph, nodes, updaters)
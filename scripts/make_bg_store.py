@@ -0,0 +1,13 @@
+# %%
+import bg_store
+import bg_pipeline
+
+###########################################################
+# one time build of the county partitioned block group store, then albany is a single partition read
+
+bg_store.build_store()
+
+albany_geoids = bg_pipeline.read_geoids(f'{bg_pipeline.dir_path}/../data/albany/2019_bg_geoids.txt')
+print(bg_store.read_jurisdiction(albany_geoids)[['GEOID', 'cvap_total']])
+
+# %%
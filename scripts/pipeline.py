@@ -0,0 +1,222 @@
+"""
+Small dependency tracked pipeline of named stages with content hash caching.
+
+Each stage writes its files into its own cache directory named by a hash of the stage name, code, params and
+inputs. A stage only reruns when that hash changes, so unchanged stages, including ones shared by different
+jurisdictions, are reused. Stages whose inputs are ready run concurrently in a process pool.
+"""
+from typing import (Callable, Dict, List, Optional)
+
+import concurrent.futures
+import hashlib
+import inspect
+import json
+import pathlib
+import shutil
+import sys
+import types
+
+HASH_INDEX_NAME = 'file_hashes.json'
+DONE_NAME = '_done'
+
+class Stage:
+    """
+    A named step of the pipeline.
+
+    func - top level function called as func(workdir, inputs, **params). It writes its outputs into workdir.
+           inputs maps each input name to a file path or, for an upstream stage, its workdir.
+    inputs - input name to a file path or to the name of an upstream stage
+    params - json serializable keyword arguments, part of the cache key
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Optional[Dict[str, str]] = None, params: Optional[Dict] = None) -> None:
+
+        self.name = name
+        self.func = func
+        self.inputs = inputs or {}
+        self.params = params or {}
+
+def file_hash(path: pathlib.Path, hash_index: Dict) -> str:
+    """
+    Return the sha256 of a file, reusing the stored hash while its size and modification time are unchanged.
+    """
+
+    stat = path.stat()
+    index_key = str(path.resolve())
+    cached = hash_index.get(index_key)
+
+    if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+        return cached['sha256']
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+
+    hash_index[index_key] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': h.hexdigest()}
+
+    return h.hexdigest()
+
+def local_modules(module: types.ModuleType) -> List[types.ModuleType]:
+    """
+    Return the module and every module in its directory it uses, directly or through another such module.
+
+    Modules are found from the module globals, both imported modules and functions or classes imported
+    from them. Installed packages are left out.
+    """
+
+    module_dir = pathlib.Path(module.__file__).resolve().parent
+
+    found = {}
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        if current.__name__ in found:
+            continue
+        found[current.__name__] = current
+
+        for value in vars(current).values():
+            dependency = value if isinstance(value, types.ModuleType) else sys.modules.get(getattr(value, '__module__', None) or '')
+            dependency_file = getattr(dependency, '__file__', None)
+            if dependency_file and pathlib.Path(dependency_file).resolve().parent == module_dir:
+                pending.append(dependency)
+
+    return [found[name] for name in sorted(found)]
+
+def code_hash(func: Callable) -> str:
+    """
+    Hash the source of the module defining func and of the local modules it uses, so a change to any
+    helper the stage calls, e.g. in acs.py or tiger.py, also invalidates the stage.
+    """
+
+    h = hashlib.sha256()
+    for module in local_modules(inspect.getmodule(func)):
+        h.update(module.__name__.encode())
+        h.update(inspect.getsource(module).encode())
+
+    return h.hexdigest()
+
+def run_stage(stage: Stage, workdir: pathlib.Path, inputs: Dict[str, pathlib.Path]) -> str:
+    """
+    Run a stage into a fresh workdir and mark it done. Runs in a worker process.
+    """
+
+    if workdir.exists():
+        shutil.rmtree(workdir)
+    workdir.mkdir(parents=True)
+
+    stage.func(workdir, inputs, **stage.params)
+
+    (workdir / DONE_NAME).touch()
+
+    return stage.name
+
+class Pipeline:
+    """
+    A set of stages run in dependency order with outputs cached under cache_dir.
+    """
+
+    def __init__(self, stages: List[Stage], cache_dir: str) -> None:
+
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = pathlib.Path(cache_dir)
+
+        for stage in stages:
+            for input_ref in stage.inputs.values():
+                if input_ref in self.stages and list(self.stages).index(input_ref) > list(self.stages).index(stage.name):
+                    raise ValueError(f'stage {stage.name} is listed before its input stage {input_ref}')
+
+    def stage_keys(self) -> Dict[str, str]:
+        """
+        Return the cache key of every stage from its code, params and the hashes of its inputs.
+        """
+
+        hash_index_path = self.cache_dir / HASH_INDEX_NAME
+        hash_index = json.loads(hash_index_path.read_text()) if hash_index_path.exists() else {}
+
+        keys = {}
+        for name, stage in self.stages.items():
+            h = hashlib.sha256()
+            h.update(name.encode())
+            h.update(stage.func.__qualname__.encode())
+            h.update(code_hash(stage.func).encode())
+            h.update(json.dumps(stage.params, sort_keys=True).encode())
+
+            for input_name, input_ref in sorted(stage.inputs.items()):
+                h.update(input_name.encode())
+                if input_ref in keys:
+                    h.update(keys[input_ref].encode())
+                else:
+                    h.update(file_hash(pathlib.Path(input_ref), hash_index).encode())
+
+            keys[name] = h.hexdigest()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        hash_index_path.write_text(json.dumps(hash_index))
+
+        return keys
+
+    def workdirs(self) -> Dict[str, pathlib.Path]:
+        """
+        Return the cache directory each stage writes into.
+        """
+
+        return {name: self.cache_dir / name / key[:16] for name, key in self.stage_keys().items()}
+
+    def run(self, n_workers: Optional[int] = None) -> Dict[str, pathlib.Path]:
+        """
+        Run every stage whose cached output is missing or stale and return the workdir of every stage.
+        """
+
+        workdirs = self.workdirs()
+
+        done = {name for name, workdir in workdirs.items() if (workdir / DONE_NAME).exists()}
+        for name in done:
+            print(f'{name}: cached')
+
+        def stage_inputs(stage):
+            return {input_name: workdirs[input_ref] if input_ref in self.stages else pathlib.Path(input_ref)
+                    for input_name, input_ref in stage.inputs.items()}
+
+        pending = [name for name in self.stages if name not in done]
+        running = {}
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+            while pending or running:
+
+                # submit every stage whose upstream stages have finished
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if all(input_ref in done for input_ref in stage.inputs.values() if input_ref in self.stages):
+                        pending.remove(name)
+                        running[executor.submit(run_stage, stage, workdirs[name], stage_inputs(stage))] = name
+
+                if not running:
+                    raise RuntimeError(f'stages {pending} can not run')
+
+                finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    future.result()
+                    done.add(name)
+                    print(f'{name}: done')
+
+        return workdirs
+
+def publish(workdir: pathlib.Path, dest_dir: str, names: Optional[List[str]] = None) -> None:
+    """
+    Copy a stage's output files to dest_dir, skipping files that are already identical.
+    """
+
+    dest_dir = pathlib.Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    for path in sorted(workdir.iterdir()):
+        if path.name == DONE_NAME or (names is not None and path.name not in names):
+            continue
+
+        dest_path = dest_dir / path.name
+        if dest_path.exists() and dest_path.read_bytes() == path.read_bytes():
+            continue
+
+        shutil.copyfile(path, dest_path)
@@ -0,0 +1,47 @@
+"""
+Filtered reads of TIGER/Line shapefiles that push the predicate and bounding box down into the reader.
+"""
+from typing import (Iterable, Optional, Tuple)
+
+import geopandas as gpd
+
+def sql_in(col: str, values: Iterable[str]) -> str:
+    """
+    Return an OGR SQL "col IN (...)" clause for string values, or a false predicate if there are none.
+    """
+
+    values = sorted(set(values))
+    # "col IN ()" is not valid OGR SQL
+    if not values:
+        return "1 = 0"
+
+    quoted = ", ".join("'" + value.replace("'", "''") + "'" for value in values)
+
+    return f"{col} IN ({quoted})"
+
+def read_block_groups(shapefile_path: str,
+                      geoids: Optional[Iterable[str]] = None,
+                      countyfp: Optional[str] = None,
+                      bbox: Optional[Tuple[float, float, float, float]] = None) -> gpd.GeoDataFrame:
+    """
+    Read only the block groups matching the filters, without decoding the rest of the file.
+
+    geoids - block group GEOIDs to keep, also narrows the read to their counties
+    countyfp - county FIPS code to keep
+    bbox - (minx, miny, maxx, maxy) in the shapefile CRS, only features intersecting it are read
+    """
+
+    predicates = []
+
+    if geoids is not None:
+        geoids = list(geoids)
+        # GEOID is state (2) + county (3) + tract (6) + block group (1)
+        predicates.append(sql_in('COUNTYFP', (geoid[2:5] for geoid in geoids)))
+        predicates.append(sql_in('GEOID', geoids))
+
+    if countyfp is not None:
+        predicates.append(sql_in('COUNTYFP', [countyfp]))
+
+    where = " AND ".join(predicates) if predicates else None
+
+    return gpd.read_file(shapefile_path, where=where, bbox=bbox).reset_index(drop=True)